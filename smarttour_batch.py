@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Relatórios por Província
+Gera um relatório de detalhe por província (para cada gabinete provincial
+de turismo) num pool de processos. Um manifesto guarda o hash do conteúdo
+de entrada de cada província: só são regenerados os relatórios cujos
+dados mudaram desde a última exportação (ou cujo ficheiro desapareceu).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from smarttour_core import SmartTourCore
+
+MANIFEST_NAME = 'manifest.json'
+
+# Incrementar quando o conteúdo do relatório muda (invalida todos os hashes)
+REPORT_FORMAT = 3
+
+logger = logging.getLogger('SmartTour')
+
+
+def province_slug(province):
+    """Nome de ficheiro ASCII estável ('Huíla' -> 'huila')"""
+    ascii_name = unicodedata.normalize('NFKD', province).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', ascii_name.lower()).strip('_') or 'provincia'
+
+
+def frame_digest(digest, df):
+    """Acrescenta ao hash as colunas, os tipos e o conteúdo (vetorizado) do DataFrame"""
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+
+def province_hash(visitors_df, sites_df, offline=False):
+    digest = hashlib.sha1(f'{REPORT_FORMAT}:{int(offline)}'.encode('ascii'))
+    frame_digest(digest, visitors_df)
+    frame_digest(digest, sites_df)
+    return digest.hexdigest()[:16]
+
+
+def province_frames(snapshot):
+    """(visitantes, sítios) de cada província, com índices reiniciados"""
+    index = snapshot.province_index
+    for province, rows in index['visitors'].items():
+        site_rows = index['sites'].get(province, [])
+        yield (province,
+               snapshot.visitors_df.iloc[rows].reset_index(drop=True),
+               snapshot.sites_df.iloc[site_rows].reset_index(drop=True))
+
+
+def build_province_report(province, visitors_df, sites_df, path, offline=False):
+    """
+    Analisa os dados de uma província e escreve o seu relatório
+    Função de módulo para poder correr num processo do pool
+    """
+    core = SmartTourCore()
+    core.set_data(visitors_df, sites_df)
+    if not core.perform_analysis():
+        raise RuntimeError("Erro na análise")
+    if not core.export_report(path, offline=offline, title=f"Relatório da Província: {province}"):
+        raise RuntimeError("Erro ao exportar relatório")
+    return path
+
+
+def load_manifest(output_dir):
+    try:
+        with open(output_dir / MANIFEST_NAME, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    """Escrita atómica (ficheiro temporário + os.replace)"""
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, output_dir / MANIFEST_NAME)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def export_province_reports(smarttour, output_dir='relatorios_provincias', workers=None,
+                            force=False, offline=False):
+    """
+    Exporta um relatório por província dos dados carregados em smarttour
+    Devolve {'generated': [...], 'skipped': [...], 'failed': {província: erro}}
+    """
+    snapshot = smarttour.snapshot()
+    if not snapshot.data_loaded:
+        logger.error("Carregue os dados primeiro")
+        return None
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    result = {'generated': [], 'skipped': [], 'failed': {}}
+
+    pending = []
+    for province, visitors_df, sites_df in province_frames(snapshot):
+        if sites_df.empty:
+            # Os KPIs de sustentabilidade e receita dependem dos sítios
+            result['failed'][province] = 'Sem sítios ecológicos na província'
+            continue
+        content_hash = province_hash(visitors_df, sites_df, offline)
+        filename = f'relatorio_{province_slug(province)}.html'
+        entry = manifest.get(province)
+        if (not force and entry and entry['hash'] == content_hash
+                and (output_dir / entry['file']).exists()):
+            result['skipped'].append(province)
+            continue
+        pending.append((province, visitors_df, sites_df, filename, content_hash))
+
+    def record(province, filename, content_hash):
+        manifest[province] = {'hash': content_hash, 'file': filename,
+                              'generated': datetime.now().isoformat(timespec='seconds')}
+        result['generated'].append(province)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+    if workers == 1:
+        for province, visitors_df, sites_df, filename, content_hash in pending:
+            try:
+                build_province_report(province, visitors_df, sites_df, str(output_dir / filename), offline)
+                record(province, filename, content_hash)
+            except Exception as e:
+                result['failed'][province] = str(e)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(build_province_report, province, visitors_df, sites_df,
+                                str(output_dir / filename), offline): (province, filename, content_hash)
+                for province, visitors_df, sites_df, filename, content_hash in pending
+            }
+            for future in as_completed(futures):
+                province, filename, content_hash = futures[future]
+                try:
+                    future.result()
+                    record(province, filename, content_hash)
+                except Exception as e:
+                    result['failed'][province] = str(e)
+
+    # Falhas perdem a entrada: voltam a ser tentadas na próxima exportação
+    for province in result['failed']:
+        manifest.pop(province, None)
+    save_manifest(output_dir, manifest)
+
+    logger.info(f"Relatórios por província: {len(result['generated'])} gerados, "
+                f"{len(result['skipped'])} inalterados, {len(result['failed'])} com erro")
+    return result
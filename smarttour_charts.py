@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Cache de Gráficos
+Figuras Plotly memorizadas como especificações JSON, indexadas por um hash
+dos valores de que cada gráfico depende. Exportações e páginas repetidas
+com os mesmos resultados reutilizam a especificação sem reconstruir a figura.
+Séries longas são reduzidas com LTTB a um orçamento de pontos configurável.
+
+Modo offline: o runtime Plotly é embutido uma única vez no relatório (opcionalmente
+comprimido) seguido das especificações compactas de todos os gráficos.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+FIGURE_CACHE_SIZE = 128
+
+# Pontos por série a partir dos quais se reduz com LTTB (tamanho do relatório limitado)
+MAX_CHART_POINTS = 2000
+
+
+def inputs_key(name, inputs):
+    """Hash estável do nome do gráfico e dos seus valores de entrada"""
+    payload = json.dumps([name, inputs], sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class FigureCache:
+    """Especificações JSON de figuras com despejo LRU limitado"""
+
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.specs = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def spec(self, name, inputs, build):
+        """
+        Especificação JSON do gráfico; build(**inputs) só é chamado
+        (fora do lock) quando estes valores ainda não estão em cache
+        """
+        key = inputs_key(name, inputs)
+        with self.lock:
+            spec = self.specs.get(key)
+            if spec is not None:
+                self.specs.move_to_end(key)
+                self.counters['hits'] += 1
+                return spec
+            self.counters['misses'] += 1
+
+        spec = build(**inputs).to_json()
+
+        with self.lock:
+            self.specs[key] = spec
+            self.specs.move_to_end(key)
+            while len(self.specs) > self.max_entries:
+                self.specs.popitem(last=False)
+                self.counters['evictions'] += 1
+        return spec
+
+    def html(self, name, inputs, build, include_plotlyjs='cdn', full_html=True):
+        return render_html(self.spec(name, inputs, build), name, include_plotlyjs, full_html)
+
+    def clear(self):
+        with self.lock:
+            self.specs.clear()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.specs), max_entries=self.max_entries)
+
+
+def lttb_indices(x, y, max_points=MAX_CHART_POINTS):
+    """
+    Índices dos pontos escolhidos pelo Largest-Triangle-Three-Buckets:
+    o primeiro e o último pontos mais, em cada balde intermédio, o que forma
+    o maior triângulo com o ponto já escolhido e a média do balde seguinte.
+    As médias dos baldes saem de somas acumuladas e as áreas de cada balde
+    são calculadas de uma vez, logo o custo é O(n) com um passo por balde.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x = x - x[0]  # Evita perda de precisão com timestamps em nanossegundos
+
+    # Limites dos n-2 baldes intermédios (os extremos ficam sempre)
+    buckets = max_points - 2
+    edges = (np.arange(buckets + 1) * (n - 2) / buckets).astype(np.int64) + 1
+
+    # Média de cada balde por somas acumuladas; o "seguinte" do último é o ponto final
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = edges[1:] - edges[:-1]
+    mean_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / counts
+    mean_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / counts
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(buckets):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # Dobro da área do triângulo (a, ponto do balde, média seguinte)
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(x, y, max_points=MAX_CHART_POINTS):
+    """
+    Série (x, y) reduzida a no máximo max_points pontos com LTTB;
+    x pode ser numérico ou datetime64 (devolvido no tipo original)
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= max_points:
+        return x, y
+    numeric_x = x.astype('datetime64[ns]').astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+    idx = lttb_indices(numeric_x, y, max_points)
+    return x[idx], y[idx]
+
+
+def render_html(spec, div_id, include_plotlyjs='cdn', full_html=True):
+    """HTML de uma especificação já serializada (sem validar/reconstruir a figura)"""
+    return pio.to_html(json.loads(spec), include_plotlyjs=include_plotlyjs,
+                       full_html=full_html, validate=False, div_id=div_id)
+
+
+# Partilhada por todos os núcleos do processo: o hash identifica os resultados
+figure_cache = FigureCache()
+
+
+def chart_placeholder(name):
+    """Contentor de um gráfico desenhado pelo bundle offline"""
+    return f'<div id="chart-{name}" class="chart"></div>'
+
+
+def compact_specs(specs):
+    """
+    Especificações {nome: JSON} num só documento; o template de layout
+    (a maior parte de cada figura) fica numa tabela partilhada
+    """
+    figures, templates, index = {}, [], {}
+    for name, spec in specs.items():
+        fig = json.loads(spec)
+        template = fig.get('layout', {}).pop('template', None)
+        if template is not None:
+            key = json.dumps(template, sort_keys=True)
+            if key not in index:
+                index[key] = len(templates)
+                templates.append(template)
+            fig['template'] = index[key]
+        figures[name] = fig
+    payload = json.dumps({'figures': figures, 'templates': templates},
+                         separators=(',', ':'), ensure_ascii=False)
+    return payload.replace('</', '<\\/')
+
+
+@lru_cache(maxsize=2)
+def plotly_runtime(compress=False):
+    """Script do runtime Plotly (já minificado), em claro ou gzip+base64"""
+    js = get_plotlyjs()
+    if not compress:
+        return f'<script type="text/javascript">{js}</script>'
+    packed = base64.b64encode(gzip.compress(js.encode('utf-8'), compresslevel=9)).decode('ascii')
+    return f'<script type="text/plain" id="smarttour-plotly">{packed}</script>'
+
+
+RENDER_SCRIPT = """<script>
+function renderSmartTourCharts() {
+    var bundle = JSON.parse(document.getElementById('smarttour-charts').textContent);
+    Object.keys(bundle.figures).forEach(function (name) {
+        var fig = bundle.figures[name], el = document.getElementById('chart-' + name);
+        if (!el) return;
+        fig.layout = fig.layout || {};
+        if (fig.template !== undefined) fig.layout.template = bundle.templates[fig.template];
+        Plotly.newPlot(el, fig.data, fig.layout, {responsive: true});
+    });
+}
+</script>"""
+
+# Descomprime o runtime no navegador (DecompressionStream) antes de desenhar
+INFLATE_SCRIPT = """<script>
+(function () {
+    var packed = atob(document.getElementById('smarttour-plotly').textContent);
+    var bytes = new Uint8Array(packed.length);
+    for (var i = 0; i < packed.length; i++) bytes[i] = packed.charCodeAt(i);
+    var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+    new Response(stream).text().then(function (code) {
+        var script = document.createElement('script');
+        script.text = code;
+        document.head.appendChild(script);
+        renderSmartTourCharts();
+    });
+})();
+</script>"""
+
+
+def offline_bundle(specs, compress=False):
+    """
+    Bloco autocontido para o fim do <body>: especificações compactas,
+    runtime Plotly (uma vez) e o script que desenha cada chart_placeholder
+    """
+    parts = [
+        f'<script type="application/json" id="smarttour-charts">{compact_specs(specs)}</script>',
+        RENDER_SCRIPT,
+        plotly_runtime(compress)
+    ]
+    parts.append(INFLATE_SCRIPT if compress else '<script>renderSmartTourCharts();</script>')
+    return '\n'.join(parts)
+
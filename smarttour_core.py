@@ -25,6 +25,19 @@ from datetime import datetime
 from pathlib import Path
 import logging
 import os
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+
+import smarttour_simulation
+import smarttour_geo
+import smarttour_diff
+from smarttour_kpis import KPIs, TourismKPIs, SustainabilityKPIs, EconomicKPIs
+from smarttour_snapshot import AnalysisSnapshot, EMPTY_SNAPSHOT
+from smarttour_charts import figure_cache, render_html, chart_placeholder, offline_bundle, downsample, MAX_CHART_POINTS
+from smarttour_report import render_report, trusted
+from smarttour_export import write_xlsx
 
 class SmartTourCore:
     """
@@ -35,18 +48,20 @@ class SmartTourCore:
     def __init__(self):
         self.setup_logging()
         
-        # Status do sistema
-        self.data_loaded = False
-        self.analysis_completed = False
+        # Dados e resultados publicados (snapshot imutável, trocado de uma só vez);
+        # leitores não usam locks, só quem publica serializa as trocas
+        self.current = EMPTY_SNAPSHOT
+        self.publish_lock = threading.Lock()
+        self.revenue_simulation = {}
         
-        # Dados principais
-        self.visitors_df = None
-        self.sites_df = None
+        # Artefactos pré-calculados por versão do dataset
+        self.geojson_cache = {}
+        self.heatmap_cache = {}
+        self.attribution_cache = (None, None)  # (versão, DataFrame meses x sítios)
         
-        # Resultados da análise
-        self.visitor_stats = {}
-        self.site_stats = {}
-        self.kpis = {}
+        # Agregados das últimas versões carregadas, para comparação entre versões
+        self.version_history = OrderedDict()
+        self.version_history_size = 8
         # Removido self.summary_report dict para evitar conflito com método
         
         # Cores do tema de Angola
@@ -57,8 +72,24 @@ class SmartTourCore:
             'verde': '#28a745'
         }
         
+        # Pontos máximos por série nos gráficos (séries maiores são reduzidas com LTTB)
+        self.chart_max_points = MAX_CHART_POINTS
+        
         self.logger.info("SmartTour Core inicializado")
     
+    # Acesso ao snapshot publicado (compatível com o código que lia os atributos)
+    data_loaded = property(lambda self: self.current.data_loaded)
+    analysis_completed = property(lambda self: self.current.analysis_completed)
+    analysis_run = property(lambda self: self.current.analysis_run)
+    dataset_version = property(lambda self: self.current.dataset_version)
+    visitors_df = property(lambda self: self.current.visitors_df)
+    sites_df = property(lambda self: self.current.sites_df)
+    province_index = property(lambda self: self.current.province_index)
+    visitor_stats = property(lambda self: self.current.visitor_stats)
+    site_stats = property(lambda self: self.current.site_stats)
+    kpis = property(lambda self: self.current.kpis)
+    kpis_json = property(lambda self: self.current.kpis_json)
+    
     def setup_logging(self):
         """Configura sistema de log"""
         os.makedirs("logs", exist_ok=True)
@@ -85,41 +116,142 @@ class SmartTourCore:
             
             # Carrega dados de visitantes
             if Path(visitors_file).exists():
-                self.visitors_df = pd.read_csv(visitors_file)
-                self.visitors_df['date'] = pd.to_datetime(self.visitors_df['date'])
-                self.logger.info(f"Visitantes carregados: {len(self.visitors_df)} registros")
+                visitors_df = pd.read_csv(visitors_file)
+                visitors_df['date'] = pd.to_datetime(visitors_df['date'])
+                self.logger.info(f"Visitantes carregados: {len(visitors_df)} registros")
             else:
                 self.logger.error(f"Arquivo não encontrado: {visitors_file}")
                 return False
             
             # Carrega dados de sítios ecológicos
             if Path(sites_file).exists():
-                self.sites_df = pd.read_csv(sites_file)
-                self.logger.info(f"Sítios carregados: {len(self.sites_df)} registros")
+                sites_df = pd.read_csv(sites_file)
+                self.logger.info(f"Sítios carregados: {len(sites_df)} registros")
             else:
                 self.logger.error(f"Arquivo não encontrado: {sites_file}")
                 return False
             
-            self.data_loaded = True
+            self.set_data(visitors_df, sites_df)
             return True
             
         except Exception as e:
             self.logger.error(f"Erro ao carregar dados: {e}")
             return False
     
-    def analyze_visitors(self):
-        """Analisa dados de visitantes"""
-        if self.visitors_df is None or self.visitors_df.empty:
+    def set_data(self, visitors_df, sites_df):
+        """
+        Publica os novos datasets (com versão e índice por província)
+        Os resultados da análise anterior deixam de estar visíveis
+        """
+        snapshot = AnalysisSnapshot(
+            dataset_version=self.compute_dataset_version(visitors_df, sites_df),
+            visitors_df=visitors_df,
+            sites_df=sites_df,
+            province_index={
+                'visitors': self.build_province_index(visitors_df),
+                'sites': self.build_province_index(sites_df)
+            },
+            data_bytes=int(visitors_df.memory_usage(deep=True).sum() + sites_df.memory_usage(deep=True).sum())
+        )
+        aggregates = smarttour_diff.aggregate_version(snapshot.dataset_version, visitors_df, sites_df)
+        with self.publish_lock:
+            self.current = snapshot
+            previous = self.version_history.pop(snapshot.dataset_version, None)
+            if previous is not None:
+                # Mesma versão, mesmos KPIs: aproveita os que já tinham sido guardados
+                aggregates = previous
+            self.version_history[snapshot.dataset_version] = aggregates
+            while len(self.version_history) > self.version_history_size:
+                self.version_history.popitem(last=False)
+    
+    def dataset_versions(self):
+        """Versões com agregados guardados, da mais antiga para a mais recente"""
+        return list(self.version_history)
+    
+    def compare_versions(self, base_version=None, target_version=None):
+        """
+        Diferenças de KPIs, províncias e sítios entre duas versões carregadas
+        (por omissão: a versão anterior contra a atual); None se faltar alguma
+        """
+        versions = self.dataset_versions()
+        target_version = target_version or self.current.dataset_version
+        if base_version is None:
+            previous = [v for v in versions if v != target_version]
+            base_version = previous[-1] if previous else None
+        
+        base = self.version_history.get(base_version)
+        target = self.version_history.get(target_version)
+        if base is None or target is None:
+            return None
+        return smarttour_diff.compare(self.version_with_kpis(base), self.version_with_kpis(target))
+    
+    def version_with_kpis(self, aggregates):
+        """
+        Agregados com os KPIs globais; os da versão atual ainda não analisada
+        são calculados aqui (só quando se pede uma comparação, nunca ao carregar)
+        """
+        data = self.current
+        if aggregates.summary is not None or aggregates.dataset_version != data.dataset_version:
+            return aggregates
+        return self.record_version_kpis(data.dataset_version, self.dataset_kpis(data)) or aggregates
+    
+    def record_version_kpis(self, dataset_version, kpis):
+        """Guarda os KPIs de uma versão no histórico de comparação (None se já saiu)"""
+        with self.publish_lock:
+            aggregates = self.version_history.get(dataset_version)
+            if aggregates is None:
+                return None
+            aggregates = aggregates.with_summary(kpis)
+            self.version_history[dataset_version] = aggregates
+            return aggregates
+    
+    def diff_report_chunks(self, diff):
+        """Relatório HTML compacto das diferenças entre duas versões (em blocos)"""
+        payload = diff.to_dict()
+        yield from render_report(
+            'diff',
+            title='Comparação de Versões do Dataset',
+            generated=datetime.now().strftime('%d/%m/%Y %H:%M'),
+            diff=diff,
+            tables=[('🗺️ Províncias', payload['provinces'], smarttour_diff.PROVINCE_METRICS),
+                    ('🌿 Sítios', payload['sites'], smarttour_diff.SITE_METRICS)],
+            labels=smarttour_diff.LABELS,
+            status_labels=smarttour_diff.STATUS_LABELS
+        )
+    
+    @staticmethod
+    def compute_dataset_version(visitors_df, sites_df):
+        """Gera identificador curto a partir do conteúdo dos dois datasets"""
+        digest = hashlib.sha1()
+        for df in (visitors_df, sites_df):
+            digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+            digest.update(','.join(df.columns).encode('utf-8'))
+        return digest.hexdigest()[:16]
+    
+    @staticmethod
+    def build_province_index(df):
+        """
+        Mapeia cada província para as posições das suas linhas (numa única
+        passagem), mantendo a ordem de aparecimento no dataset
+        """
+        positions = df.groupby('province', sort=False).indices
+        return {province: positions[province] for province in df['province'].unique()}
+    
+    def analyze_visitors(self, data=None):
+        """Analisa dados de visitantes (do snapshot dado ou do publicado)"""
+        data = data or self.current
+        visitors_df = data.visitors_df
+        if visitors_df is None or visitors_df.empty:
             return {}
         
         # Estatísticas básicas
-        total_visitors = int(self.visitors_df['visitors_total'].sum())
-        provinces_count = self.visitors_df['province'].nunique()
+        total_visitors = int(visitors_df['visitors_total'].sum())
+        provinces_count = visitors_df['province'].nunique()
         
         # Análise por província
         province_stats = {}
-        for province in self.visitors_df['province'].unique():
-            prov_data = self.visitors_df[self.visitors_df['province'] == province]
+        for province, rows in data.province_index['visitors'].items():
+            prov_data = visitors_df.iloc[rows]
             province_stats[province] = {
                 'total_visitors': int(prov_data['visitors_total'].sum()),
                 'foreign_percentage': round(prov_data['foreign_share'].mean() * 100, 1),
@@ -127,9 +259,9 @@ class SmartTourCore:
             }
         
         # Análise sazonal
-        seasonal_data = self.visitors_df.groupby('season')['visitors_total'].sum()
+        seasonal_data = visitors_df.groupby('season')['visitors_total'].sum()
         
-        self.visitor_stats = {
+        return {
             'total_visitors': total_visitors,
             'provinces_count': provinces_count,
             'by_province': province_stats,
@@ -138,30 +270,30 @@ class SmartTourCore:
                 'offpeak_visitors': int(seasonal_data.get('offpeak', 0))
             }
         }
-        
-        return self.visitor_stats
     
-    def analyze_sites(self):
-        """Analisa dados de sítios ecológicos"""
-        if self.sites_df is None or self.sites_df.empty:
+    def analyze_sites(self, data=None):
+        """Analisa dados de sítios ecológicos (do snapshot dado ou do publicado)"""
+        data = data or self.current
+        sites_df = data.sites_df
+        if sites_df is None or sites_df.empty:
             return {}
         
         # Estatísticas básicas
-        total_sites = len(self.sites_df)
-        total_capacity = int(self.sites_df['capacity_daily'].sum())
-        avg_fragility = round(self.sites_df['fragility_index'].mean(), 2)
+        total_sites = len(sites_df)
+        total_capacity = int(sites_df['capacity_daily'].sum())
+        avg_fragility = round(sites_df['fragility_index'].mean(), 2)
         
         # Análise de sustentabilidade
-        high_sustain = len(self.sites_df[self.sites_df['fragility_index'] <= 2])
-        moderate_sustain = len(self.sites_df[self.sites_df['fragility_index'] == 3])
-        low_sustain = len(self.sites_df[self.sites_df['fragility_index'] >= 4])
+        high_sustain = len(sites_df[sites_df['fragility_index'] <= 2])
+        moderate_sustain = len(sites_df[sites_df['fragility_index'] == 3])
+        low_sustain = len(sites_df[sites_df['fragility_index'] >= 4])
         
         sustainable_percentage = round((high_sustain + moderate_sustain) / total_sites * 100, 1)
         
         # Análise por província
         province_sites = {}
-        for province in self.sites_df['province'].unique():
-            prov_data = self.sites_df[self.sites_df['province'] == province]
+        for province, rows in data.province_index['sites'].items():
+            prov_data = sites_df.iloc[rows]
             province_sites[province] = {
                 'sites_count': len(prov_data),
                 'capacity': int(prov_data['capacity_daily'].sum()),
@@ -169,7 +301,7 @@ class SmartTourCore:
                 'sites_list': prov_data['site_name'].tolist()
             }
         
-        self.site_stats = {
+        return {
             'total_sites': total_sites,
             'total_capacity': total_capacity,
             'avg_fragility': avg_fragility,
@@ -181,100 +313,257 @@ class SmartTourCore:
             },
             'by_province': province_sites
         }
+    
+    def attribute_visitors(self, data=None):
+        """
+        Atribui os visitantes de cada província-mês aos sítios ecológicos
+        (modelo gravitacional). Calculado uma vez por versão do dataset.
+        Retorna DataFrame meses x sítios.
+        """
+        data = data or self.current
+        version, attribution = self.attribution_cache
+        if attribution is None or version != data.dataset_version:
+            attribution = smarttour_geo.attribute_visitors(data.visitors_df, data.sites_df)
+            self.attribution_cache = (data.dataset_version, attribution)
+            
+            attributed = attribution.to_numpy().sum()
+            total = data.visitors_df['visitors_total'].sum()
+            if total > 0 and attributed < total * 0.999:
+                self.logger.warning(f"{(1 - attributed / total) * 100:.1f}% dos visitantes sem sítio ao alcance")
         
-        return self.site_stats
+        return attribution
     
-    def calculate_kpis(self):
-        """Calcula KPIs principais do sistema"""
-        if not self.visitor_stats or not self.site_stats:
+    def analyze_site_demand(self, data=None):
+        """KPIs por sítio (visitantes, receita e pressão) a partir da atribuição"""
+        data = data or self.current
+        sites_df = data.sites_df
+        if sites_df is None or sites_df.empty:
             return {}
         
+        monthly = self.attribute_visitors(data).mean().to_numpy(dtype=float)
+        fees = sites_df['fee_aoa'].to_numpy(dtype=float)
+        capacity = sites_df['capacity_daily'].to_numpy(dtype=float)
+        
+        by_site = pd.DataFrame({
+            'province': sites_df['province'].to_numpy(),
+            'monthly_visitors': monthly.round().astype(int),
+            'annual_visitors': (monthly * 12).round().astype(int),
+            'annual_revenue': (monthly * 12 * fees).round().astype(int),
+            # Pressão: visitantes diários atribuídos / capacidade diária
+            'pressure': np.round(monthly / 30 / capacity, 3)
+        }, index=sites_df['site_name'])
+        
+        return by_site.to_dict(orient='index')
+    
+    def province_month_table(self, data=None):
+        """Agregados por província × mês (visitantes, estrangeiros, estadia média)"""
+        data = data or self.current
+        if not data.data_loaded:
+            return None
+        
+        visitors_df = data.visitors_df
+        df = visitors_df.assign(
+            foreign_visitors=visitors_df['visitors_total'] * visitors_df['foreign_share'],
+            visitor_nights=visitors_df['visitors_total'] * visitors_df['avg_stay_nights']
+        )
+        table = df.groupby(['province', 'year', 'month'], sort=True).agg(
+            date=('date', 'min'),
+            season=('season', 'first'),
+            visitors_total=('visitors_total', 'sum'),
+            foreign_visitors=('foreign_visitors', 'sum'),
+            visitor_nights=('visitor_nights', 'sum')
+        ).reset_index()
+        
+        # Médias ponderadas pelos visitantes
+        visitors = table['visitors_total'].where(table['visitors_total'] > 0)
+        table['foreign_share'] = (table['foreign_visitors'] / visitors).fillna(0).round(4)
+        table['avg_stay_nights'] = (table['visitor_nights'] / visitors).fillna(0).round(2)
+        table['foreign_visitors'] = table['foreign_visitors'].round().astype(int)
+        return table.drop(columns='visitor_nights')
+    
+    def site_metrics_table(self, data=None):
+        """Métricas por sítio: atributos do sítio + procura atribuída pela análise"""
+        data = data or self.current
+        if not data.analysis_completed or 'by_site' not in data.site_stats:
+            return None
+        
+        metrics = pd.DataFrame.from_dict(data.site_stats['by_site'], orient='index').drop(columns='province')
+        return data.sites_df.join(metrics, on='site_name')
+    
+    def workbook_sheets(self, data=None):
+        """
+        Folhas do livro XLSX: [(nome, DataFrame), ...] por província, por
+        província × mês e por sítio (mais os KPIs se a análise estiver concluída)
+        """
+        data = data or self.current
+        if not data.data_loaded:
+            return None
+        
+        sites = smarttour_diff.site_aggregates(data.sites_df)
+        provinces = smarttour_diff.province_aggregates(data.visitors_df, sites)
+        sheets = [
+            ('Províncias', provinces.rename_axis('province').reset_index()),
+            ('Província x Mês', self.province_month_table(data))
+        ]
+        site_metrics = self.site_metrics_table(data)
+        sheets.append(('Sítios', site_metrics if site_metrics is not None else sites.reset_index()))
+        
+        if data.analysis_completed and data.kpis is not None:
+            groups = {'tourism_kpis': 'Turismo', 'sustainability_kpis': 'Sustentabilidade',
+                      'economic_kpis': 'Económicos'}
+            rows = [(groups[group], smarttour_diff.LABELS.get(name, name), value)
+                    for group, values in data.kpis.to_dict().items()
+                    for name, value in values.items()]
+            sheets.append(('KPIs', pd.DataFrame(rows, columns=['grupo', 'kpi', 'valor'])))
+        return sheets
+    
+    def export_xlsx(self, filename="smarttour_angola_dados.xlsx", data=None, progress=None):
+        """Exporta as tabelas num livro XLSX com uma folha por tabela (escrita em streaming)"""
+        sheets = self.workbook_sheets(data)
+        if sheets is None:
+            self.logger.error("Carregue os dados primeiro")
+            return False
+        
+        try:
+            write_xlsx(filename, sheets, progress=progress)
+            self.logger.info(f"Livro XLSX exportado: {filename}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao exportar XLSX: {e}")
+            return False
+    
+    def dataset_kpis(self, data=None):
+        """KPIs de uma versão dos dados sem a análise completa (comparação de versões ainda não analisadas)"""
+        data = data or self.current
+        return self.calculate_kpis(self.analyze_visitors(data), self.analyze_sites(data), data)
+    
+    def calculate_kpis(self, visitor_stats, site_stats, data=None):
+        """Calcula KPIs principais a partir das estatísticas de visitantes e sítios"""
+        data = data or self.current
+        if not visitor_stats or not site_stats:
+            return None
+        
         # KPIs de turismo (estimativa anual baseada nos dados mensais)
-        monthly_visitors = self.visitor_stats['total_visitors']
+        monthly_visitors = visitor_stats['total_visitors']
         annual_visitors = monthly_visitors * 12
         
         # KPIs de sustentabilidade
-        sustainability_score = round(10 - (self.site_stats['avg_fragility'] * 2), 1)
+        sustainability_score = round(10 - (site_stats['avg_fragility'] * 2), 1)
         
         # KPIs econômicos (estimativa básica)
-        avg_fee = self.sites_df['fee_aoa'].mean() if 'fee_aoa' in self.sites_df.columns else 5000
-        estimated_revenue = int(self.site_stats['total_capacity'] * avg_fee * 365 * 0.6)  # 60% ocupação
+        avg_fee = data.sites_df['fee_aoa'].mean() if 'fee_aoa' in data.sites_df.columns else 5000
+        estimated_revenue = int(site_stats['total_capacity'] * avg_fee * 365 * 0.6)  # 60% ocupação
         
         # Calcula percentuais médios
-        avg_foreign_percentage = round(np.mean([p['foreign_percentage'] for p in self.visitor_stats['by_province'].values()]), 1)
-        avg_stay_duration = round(np.mean([p['avg_stay_nights'] for p in self.visitor_stats['by_province'].values()]), 1)
+        avg_foreign_percentage = round(np.mean([p['foreign_percentage'] for p in visitor_stats['by_province'].values()]), 1)
+        avg_stay_duration = round(np.mean([p['avg_stay_nights'] for p in visitor_stats['by_province'].values()]), 1)
         
         # Calcula variação sazonal
         seasonal_variation = 0
-        if self.visitor_stats['seasonal']['peak_visitors'] > 0 and self.visitor_stats['seasonal']['offpeak_visitors'] > 0:
-            peak = self.visitor_stats['seasonal']['peak_visitors']
-            offpeak = self.visitor_stats['seasonal']['offpeak_visitors']
+        if visitor_stats['seasonal']['peak_visitors'] > 0 and visitor_stats['seasonal']['offpeak_visitors'] > 0:
+            peak = visitor_stats['seasonal']['peak_visitors']
+            offpeak = visitor_stats['seasonal']['offpeak_visitors']
             seasonal_variation = round((peak - offpeak) / offpeak * 100, 1)
         
-        # Estrutura compatível com template web (usando SimpleNamespace para acesso por atributo)
-        from types import SimpleNamespace
-        
-        self.kpis = SimpleNamespace(
-            tourism_kpis=SimpleNamespace(
-                total_annual_visitors=annual_visitors,
-                provinces_count=self.visitor_stats['provinces_count'],
-                foreign_visitor_percentage=avg_foreign_percentage,
-                average_stay_duration=avg_stay_duration,
-                seasonal_variation=seasonal_variation
+        # Modelo único de KPIs (API, templates e desktop), serializado uma vez por execução
+        return KPIs(
+            tourism_kpis=TourismKPIs(
+                total_annual_visitors=int(annual_visitors),
+                provinces_count=int(visitor_stats['provinces_count']),
+                foreign_visitor_percentage=float(avg_foreign_percentage),
+                average_stay_duration=float(avg_stay_duration),
+                seasonal_variation=float(seasonal_variation)
             ),
-            sustainability_kpis=SimpleNamespace(
-                total_sites=self.site_stats['total_sites'],
-                total_eco_capacity=self.site_stats['total_capacity'],
-                sustainable_sites_percentage=self.site_stats['sustainable_percentage'],
-                average_sustainability_score=sustainability_score,
-                provinces_with_eco_sites=len(self.site_stats['by_province'])
+            sustainability_kpis=SustainabilityKPIs(
+                total_sites=int(site_stats['total_sites']),
+                total_eco_capacity=int(site_stats['total_capacity']),
+                sustainable_sites_percentage=float(site_stats['sustainable_percentage']),
+                average_sustainability_score=float(sustainability_score),
+                provinces_with_eco_sites=len(site_stats['by_province'])
             ),
-            economic_kpis=SimpleNamespace(
-                estimated_annual_revenue=estimated_revenue,
-                average_site_fee=round(avg_fee, 0)
+            economic_kpis=EconomicKPIs(
+                estimated_annual_revenue=int(estimated_revenue),
+                average_site_fee=float(round(avg_fee, 0))
             )
         )
+    
+    def get_geojson(self):
+        """
+        Retorna o GeoJSON de sítios e províncias como (bytes, bytes gzip)
+        Gerado uma única vez por versão do dataset
+        """
+        data = self.current
+        if not data.data_loaded:
+            return None
         
-        # Também mantém estrutura em dict para compatibilidade com outras interfaces
-        self.kpis_dict = {
-            'tourism': {
-                'annual_visitors': annual_visitors,
-                'provinces_count': self.visitor_stats['provinces_count'],
-                'avg_foreign_percentage': avg_foreign_percentage
-            },
-            'sustainability': {
-                'total_sites': self.site_stats['total_sites'],
-                'total_capacity': self.site_stats['total_capacity'],
-                'sustainable_percentage': self.site_stats['sustainable_percentage'],
-                'sustainability_score': sustainability_score
-            },
-            'economic': {
-                'estimated_annual_revenue': estimated_revenue,
-                'avg_site_fee': round(avg_fee, 0)
-            }
-        }
+        version = data.dataset_version
+        if version not in self.geojson_cache:
+            collection = smarttour_geo.build_geojson(data.sites_df, data.visitors_df)
+            self.geojson_cache = {version: smarttour_geo.encode_geojson(collection)}
+            self.logger.info(f"GeoJSON gerado para o dataset {version}")
         
-        return self.kpis
+        return self.geojson_cache[version]
+    
+    def get_heatmap(self, resolution=0.5):
+        """
+        Grelha de densidade (capacidade e pressão de visitantes)
+        Guardada em cache por versão do dataset e resolução (arredondada a
+        uma das HEATMAP_RESOLUTIONS, o que limita o tamanho da cache)
+        """
+        data = self.current
+        if not data.data_loaded:
+            return None
+        
+        key = (data.dataset_version, smarttour_geo.snap_resolution(resolution))
+        if key not in self.heatmap_cache:
+            # Descarta grelhas de versões anteriores do dataset
+            self.heatmap_cache = {k: v for k, v in self.heatmap_cache.items() if k[0] == key[0]}
+            demand = self.attribute_visitors(data).mean().to_numpy(dtype=float)
+            self.heatmap_cache[key] = smarttour_geo.build_heatmap(data.sites_df, demand, resolution=key[1])
+        
+        return self.heatmap_cache[key]
     
-    def summary_report(self):
-        """Gera relatório resumido para apresentação"""
-        if not hasattr(self, 'kpis'):
-            self.calculate_kpis()
+    def simulate_revenue(self, n_draws=1_000_000, workers=None, seed=None):
+        """
+        Simulação Monte Carlo da receita anual
+        Alternativa à estimativa pontual (60% de ocupação) de calculate_kpis
+        """
+        data = self.current
+        if not data.data_loaded:
+            self.logger.error("Carregue os dados primeiro")
+            return {}
+        
+        self.logger.info(f"Simulando receita: {n_draws:,} sorteios...")
+        self.revenue_simulation = smarttour_simulation.simulate_revenue(
+            data.visitors_df, data.sites_df,
+            n_draws=n_draws, workers=workers, seed=seed
+        )
+        self.logger.info(f"Receita mediana simulada: {self.revenue_simulation['percentiles']['p50']:,} AOA")
+        return self.revenue_simulation
+    
+    def summary_report(self, data=None):
+        """Gera relatório resumido para apresentação (do snapshot dado ou do publicado)"""
+        data = data or self.current
+        kpis = data.kpis
+        if kpis is None:
+            self.logger.error("Execute a análise primeiro")
+            return None
         
         # Para uso no terminal (string simples)
         if hasattr(self, '_terminal_format'):
             summary = []
-            tourism = self.kpis.tourism_kpis
+            tourism = kpis.tourism_kpis
             summary.append(f"🏛️ TURISMO: {tourism.total_annual_visitors:,} visitantes/ano em {tourism.provinces_count} províncias")
             summary.append(f"   • {tourism.foreign_visitor_percentage}% visitantes estrangeiros")
             summary.append(f"   • Estadia média: {tourism.average_stay_duration} noites")
             
-            sust = self.kpis.sustainability_kpis
+            sust = kpis.sustainability_kpis
             summary.append(f"🌱 SUSTENTABILIDADE: {sust.total_sites} sítios ecoturísticos")
             summary.append(f"   • {sust.sustainable_sites_percentage}% dos sítios são sustentáveis")
             summary.append(f"   • Score médio: {sust.average_sustainability_score}/10")
             
-            econ = self.kpis.economic_kpis
+            econ = kpis.economic_kpis
             summary.append(f"💰 ECONOMIA: {econ.estimated_annual_revenue:,} AOA/ano estimado")
             summary.append(f"   • Taxa média: {econ.average_site_fee:,} AOA")
             
@@ -287,9 +576,9 @@ class SmartTourCore:
         summary.executive_summary = SimpleNamespace()
         
         # Principais achados baseados nos dados
-        tourism = self.kpis.tourism_kpis
-        sust = self.kpis.sustainability_kpis
-        econ = self.kpis.economic_kpis
+        tourism = kpis.tourism_kpis
+        sust = kpis.sustainability_kpis
+        econ = kpis.economic_kpis
         
         summary.executive_summary.key_findings = [
             f"Angola recebe aproximadamente {tourism.total_annual_visitors:,} visitantes por ano",
@@ -300,12 +589,18 @@ class SmartTourCore:
             f"Receita estimada do ecoturismo: {econ.estimated_annual_revenue:,} AOA/ano"
         ]
         
+        summary.executive_summary.recommendations = [
+            "Promover sítios com alta sustentabilidade",
+            "Desenvolver infraestrutura em províncias com baixo turismo",
+            "Implementar monitoramento de capacidade de carga"
+        ]
+        
         # Top províncias (simulado com dados reais se disponível)
         summary.top_provinces = {}
-        if hasattr(self, 'visitor_stats') and 'by_province' in self.visitor_stats:
+        if 'by_province' in data.visitor_stats:
             # Usar dados reais se disponível
             sorted_provinces = sorted(
-                self.visitor_stats['by_province'].items(),
+                data.visitor_stats['by_province'].items(),
                 key=lambda x: x[1].get('total_visitors', 0),
                 reverse=True
             )[:5]
@@ -330,41 +625,63 @@ class SmartTourCore:
     
     def get_terminal_summary(self):
         """Retorna resumo em formato string para terminal"""
-        if not hasattr(self, 'kpis'):
-            self.calculate_kpis()
+        kpis = self.kpis
+        if kpis is None:
+            self.logger.error("Execute a análise primeiro")
+            return ""
             
         summary = []
-        tourism = self.kpis.tourism_kpis
+        tourism = kpis.tourism_kpis
         summary.append(f"🏛️ TURISMO: {tourism.total_annual_visitors:,} visitantes/ano em {tourism.provinces_count} províncias")
         summary.append(f"   • {tourism.foreign_visitor_percentage}% visitantes estrangeiros")
         summary.append(f"   • Estadia média: {tourism.average_stay_duration} noites")
         
-        sust = self.kpis.sustainability_kpis
+        sust = kpis.sustainability_kpis
         summary.append(f"🌱 SUSTENTABILIDADE: {sust.total_sites} sítios ecoturísticos")
         summary.append(f"   • {sust.sustainable_sites_percentage}% dos sítios são sustentáveis")
         summary.append(f"   • Score médio: {sust.average_sustainability_score}/10")
         
-        econ = self.kpis.economic_kpis
+        econ = kpis.economic_kpis
         summary.append(f"💰 ECONOMIA: {econ.estimated_annual_revenue:,} AOA/ano estimado")
         summary.append(f"   • Taxa média: {econ.average_site_fee:,} AOA")
         
         return "\n".join(summary)
     
-    def perform_analysis(self):
-        """Executa análise completa dos dados"""
-        if not self.data_loaded:
+    def perform_analysis(self, progress=None):
+        """
+        Executa análise completa dos dados
+        Os resultados são construídos à parte, sobre o snapshot dos dados no
+        início, e publicados no fim com uma única troca de referência
+        progress: callback opcional progress(percentagem, mensagem) por etapa
+        """
+        data = self.current
+        if not data.data_loaded:
             self.logger.error("Carregue os dados primeiro")
             return False
         
+        def stage(i, message):
+            if progress:
+                progress(round(i / 4 * 100), message)
+        
         try:
             self.logger.info("Iniciando análise...")
             
-            # Executa análises
-            self.analyze_visitors()
-            self.analyze_sites()
-            self.calculate_kpis()
+            # Executa análises, reportando o progresso real de cada etapa
+            stage(0, "Analisando visitantes...")
+            visitor_stats = self.analyze_visitors(data)
+            stage(1, "Analisando sítios ecológicos...")
+            site_stats = self.analyze_sites(data)
+            stage(2, "Atribuindo visitantes aos sítios...")
+            site_stats['by_site'] = self.analyze_site_demand(data)
+            stage(3, "Calculando KPIs...")
+            kpis = self.calculate_kpis(visitor_stats, site_stats, data)
+            
+            if progress:
+                progress(100, "Análise concluída")
             
-            self.analysis_completed = True
+            results = data.with_results(uuid.uuid4().hex[:12], visitor_stats, site_stats, kpis)
+            if not self.publish(results):
+                return False
             self.logger.info("Análise concluída com sucesso!")
             return True
             
@@ -372,172 +689,238 @@ class SmartTourCore:
             self.logger.error(f"Erro na análise: {e}")
             return False
     
-    def create_charts(self):
-        """Cria gráficos principais"""
-        if not self.analysis_completed:
-            return {}
+    def publish(self, snapshot):
+        """
+        Torna o snapshot visível (troca atómica da referência)
+        Recusado se entretanto foram carregados outros dados
+        """
+        with self.publish_lock:
+            if snapshot.dataset_version != self.current.dataset_version:
+                self.logger.warning("Resultados descartados: o dataset mudou durante a análise")
+                return False
+            self.current = snapshot
+        if snapshot.kpis is not None:
+            self.record_version_kpis(snapshot.dataset_version, snapshot.kpis)
+        return True
+    
+    def analysis_results(self):
+        """Resultados da análise num dict serializável (para passar entre processos)"""
+        data = self.current
+        version, attribution = self.attribution_cache
+        return {
+            'dataset_version': data.dataset_version,
+            'analysis_run': data.analysis_run,
+            'visitor_stats': data.visitor_stats,
+            'site_stats': data.site_stats,
+            'kpis': data.kpis,
+            'site_attribution': attribution if version == data.dataset_version else None
+        }
+    
+    def apply_analysis_results(self, results):
+        """
+        Aplica resultados calculados noutro processo
+        Ignorados se os dados foram trocados entretanto (versão diferente)
+        """
+        data = self.current
+        if results.get('dataset_version') != data.dataset_version:
+            self.logger.warning("Resultados descartados: o dataset mudou durante a análise")
+            return False
         
+        if results.get('site_attribution') is not None:
+            self.attribution_cache = (data.dataset_version, results['site_attribution'])
+        return self.publish(data.with_results(results['analysis_run'], results['visitor_stats'],
+                                              results['site_stats'], results['kpis']))
+    
+    # Gráficos principais, pela ordem em que aparecem nos relatórios
+    CHART_NAMES = ('visitors_by_province', 'visitors_trend', 'kpi_dashboard')
+    
+    def chart_inputs(self, data=None):
+        """
+        Entradas de cada gráfico principal, {nome: (valores, construtor)},
+        do snapshot dado ou do publicado; não constrói nenhuma figura
+        """
+        data = data or self.current
         charts = {}
-        
+        for name in self.CHART_NAMES:
+            chart = self.chart_input(name, data)
+            if chart is not None:
+                charts[name] = chart
+        return charts
+    
+    def chart_input(self, name, data=None):
+        """
+        Entradas (valores, construtor) de um só gráfico, sem calcular as dos
+        outros; None se o gráfico não existir para estes dados
+        """
+        data = data or self.current
+        if not data.analysis_completed:
+            return None
+        
+        # Gráfico de visitantes por província
+        if name == 'visitors_by_province':
+            if not data.visitor_stats['by_province']:
+                return None
+            return ({
+                'provinces': list(data.visitor_stats['by_province'].keys()),
+                'visitors': [stats['total_visitors'] for stats in data.visitor_stats['by_province'].values()],
+                'color': self.colors['vermelho']
+            }, self.build_province_chart)
+        
+        # Evolução temporal dos visitantes (reduzida ao orçamento de pontos)
+        if name == 'visitors_trend':
+            monthly = data.visitors_df.groupby('date', sort=True)['visitors_total'].sum()
+            if len(monthly) <= 1:
+                return None
+            dates, visitors = downsample(monthly.index.to_numpy(), monthly.to_numpy(), self.chart_max_points)
+            return ({
+                'dates': np.datetime_as_string(dates, unit='D').tolist(),
+                'visitors': visitors.tolist(),
+                'total_points': len(monthly),
+                'color': self.colors['vermelho']
+            }, self.build_trend_chart)
+        
+        # Dashboard de KPIs
+        if name == 'kpi_dashboard':
+            return ({
+                'total_visitors': data.kpis.tourism_kpis.total_annual_visitors,
+                'sustainability_score': data.kpis.sustainability_kpis.average_sustainability_score,
+                'bar_color': self.colors['vermelho'],
+                'gauge_color': self.colors['verde']
+            }, self.build_kpi_dashboard)
+        
+        return None
+    
+    def chart_spec(self, name, data=None):
+        """Especificação JSON de um gráfico (da cache se as entradas não mudaram)"""
+        chart = self.chart_input(name, data)
+        if chart is None:
+            return None
+        inputs, build = chart
+        return figure_cache.spec(name, inputs, build)
+    
+    def chart_specs(self, data=None):
+        """Especificações JSON dos gráficos principais"""
+        specs = {}
         try:
-            # Gráfico de visitantes por província
-            if self.visitor_stats['by_province']:
-                provinces = list(self.visitor_stats['by_province'].keys())
-                visitors = [data['total_visitors'] for data in self.visitor_stats['by_province'].values()]
-                
-                fig = px.bar(
-                    x=provinces, y=visitors,
-                    title="Visitantes por Província",
-                    color_discrete_sequence=[self.colors['vermelho']]
-                )
-                fig.update_layout(
-                    xaxis_title="Província",
-                    yaxis_title="Número de Visitantes"
-                )
-                charts['visitors_by_province'] = fig.to_html(include_plotlyjs='cdn')
-            
-            # Dashboard de KPIs
-            fig = make_subplots(
-                rows=2, cols=2,
-                subplot_titles=('Visitantes Anuais', 'Score Sustentabilidade', 'Receita Anual (M AOA)', 'Capacidade Eco'),
-                specs=[[{'type': 'bar'}, {'type': 'indicator'}],
-                       [{'type': 'bar'}, {'type': 'indicator'}]]
-            )
-            
-            # Usar self.kpis_dict para compatibilidade
-            fig.add_trace(go.Bar(
-                x=['Visitantes'],
-                y=[self.kpis_dict['tourism']['annual_visitors']], 
-                name='Visitantes',
-                marker_color=self.colors['vermelho']
-            ), row=1, col=1)
-            
-            fig.add_trace(go.Indicator(
-                mode="gauge+number",
-                value=self.kpis_dict['sustainability']['sustainability_score'],
-                title={'text': "Score"},
-                gauge={'axis': {'range': [None, 10]},
-                       'bar': {'color': self.colors['verde']},
-                       'steps': [{'range': [0, 5], 'color': "lightgray"},
-                                {'range': [5, 8], 'color': "yellow"},
-                                {'range': [8, 10], 'color': "green"}]}
-            ), row=1, col=2)
-            
-            revenue_millions = self.kpis_dict['economic']['estimated_annual_revenue'] / 1_000_000
-            
-            fig.update_layout(title="Dashboard SmartTour Angola", height=600, showlegend=False)
-            charts['kpi_dashboard'] = fig.to_html(include_plotlyjs='cdn')
-            
+            for name, (inputs, build) in self.chart_inputs(data).items():
+                specs[name] = figure_cache.spec(name, inputs, build)
         except Exception as e:
             self.logger.error(f"Erro ao criar gráficos: {e}")
+        return specs
+    
+    def create_charts(self, data=None):
+        """Cria gráficos principais em HTML (Plotly via CDN)"""
+        return {name: render_html(spec, name) for name, spec in self.chart_specs(data).items()}
+    
+    @staticmethod
+    def build_province_chart(provinces, visitors, color):
+        fig = px.bar(
+            x=provinces, y=visitors,
+            title="Visitantes por Província",
+            color_discrete_sequence=[color]
+        )
+        fig.update_layout(
+            xaxis_title="Província",
+            yaxis_title="Número de Visitantes"
+        )
+        return fig
+    
+    @staticmethod
+    def build_trend_chart(dates, visitors, total_points, color):
+        title = "Evolução de Visitantes"
+        if total_points > len(dates):
+            title += f" ({len(dates):,} de {total_points:,} pontos)"
+        fig = go.Figure(go.Scatter(x=dates, y=visitors, mode='lines', line={'color': color}))
+        fig.update_layout(title=title, xaxis_title="Data", yaxis_title="Número de Visitantes")
+        return fig
+    
+    @staticmethod
+    def build_kpi_dashboard(total_visitors, sustainability_score, bar_color, gauge_color):
+        fig = make_subplots(
+            rows=2, cols=2,
+            subplot_titles=('Visitantes Anuais', 'Score Sustentabilidade', 'Receita Anual (M AOA)', 'Capacidade Eco'),
+            specs=[[{'type': 'bar'}, {'type': 'indicator'}],
+                   [{'type': 'bar'}, {'type': 'indicator'}]]
+        )
         
-        return charts
+        fig.add_trace(go.Bar(
+            x=['Visitantes'],
+            y=[total_visitors], 
+            name='Visitantes',
+            marker_color=bar_color
+        ), row=1, col=1)
+        
+        fig.add_trace(go.Indicator(
+            mode="gauge+number",
+            value=sustainability_score,
+            title={'text': "Score"},
+            gauge={'axis': {'range': [None, 10]},
+                   'bar': {'color': gauge_color},
+                   'steps': [{'range': [0, 5], 'color': "lightgray"},
+                            {'range': [5, 8], 'color': "yellow"},
+                            {'range': [8, 10], 'color': "green"}]}
+        ), row=1, col=2)
+        
+        fig.update_layout(title="Dashboard SmartTour Angola", height=600, showlegend=False)
+        return fig
+    
+    def report_chunks(self, data=None, offline=False, compress=False, title=None):
+        """
+        Gera o relatório HTML em blocos (template compilado em streaming)
+        para escrita em ficheiro ou envio sem montar a página inteira.
+        offline=True embute o runtime Plotly uma vez (comprimido com compress=True)
+        e os gráficos como especificações JSON compactas, sem depender da CDN;
+        title aparece no cabeçalho (ex.: relatório de uma província)
+        """
+        data = data or self.current
+        if offline:
+            specs = self.chart_specs(data)
+            charts = [chart_placeholder(name) for name in specs]
+            bundle = offline_bundle(specs, compress)
+        else:
+            charts = list(self.create_charts(data).values())
+            bundle = ''
+        
+        kpis = data.kpis
+        kpi_cards = [
+            ('Visitantes Anuais', f"{kpis.tourism_kpis.total_annual_visitors:,}"),
+            ('Sites Sustentáveis', f"{kpis.sustainability_kpis.sustainable_sites_percentage}%"),
+            ('Capacidade Diária', f"{kpis.sustainability_kpis.total_eco_capacity:,}"),
+            ('Score Sustentabilidade', kpis.sustainability_kpis.average_sustainability_score)
+        ]
+        
+        # Ordena províncias por visitantes; as linhas são geradas à medida que o template as consome
+        sorted_provinces = sorted(
+            data.visitor_stats['by_province'].items(),
+            key=lambda x: x[1]['total_visitors'],
+            reverse=True
+        )
+        provinces = (SimpleNamespace(province=province, visitors=stats['total_visitors'],
+                                     foreign=stats['foreign_percentage'], stay=stats['avg_stay_nights'])
+                     for province, stats in sorted_provinces)
+        
+        yield from render_report(
+            'core',
+            title=title,
+            generated=datetime.now().strftime('%d/%m/%Y %H:%M'),
+            kpi_cards=kpi_cards,
+            charts=[trusted(chart) for chart in charts],
+            provinces=provinces,
+            stay_label='Estadia Média (noites)',
+            bundle=trusted(bundle)
+        )
     
-    def export_report(self, filename="smarttour_angola_report.html"):
-        """Exporta relatório HTML completo"""
-        if not self.analysis_completed:
+    def export_report(self, filename="smarttour_angola_report.html", offline=False, compress=False, title=None):
+        """Exporta relatório HTML completo (autocontido com offline=True)"""
+        data = self.current
+        if not data.analysis_completed:
             self.logger.error("Execute a análise primeiro")
             return False
         
         try:
-            charts = self.create_charts()
-            
-            # Template HTML simplificado
-            html = f"""<!DOCTYPE html>
-<html lang="pt">
-<head>
-    <meta charset="UTF-8">
-    <title>SmartTour Angola - Relatório</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }}
-        .header {{ background: linear-gradient(135deg, #CE1126, #FFCD00); 
-                   color: white; padding: 30px; text-align: center; 
-                   border-radius: 10px; margin-bottom: 20px; }}
-        .section {{ background: white; margin: 20px 0; padding: 25px; 
-                    border-radius: 10px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }}
-        .kpi-grid {{ display: grid; grid-template-columns: repeat(4, 1fr); 
-                     gap: 20px; margin: 20px 0; }}
-        .kpi-card {{ background: #f8f9fa; padding: 20px; border-radius: 8px; 
-                     text-align: center; border-left: 4px solid #CE1126; }}
-        .kpi-value {{ font-size: 2em; font-weight: bold; color: #CE1126; }}
-        .kpi-label {{ color: #666; margin-top: 10px; }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>🇦🇴 SmartTour Angola</h1>
-        <p>Sistema de Análise de Turismo Sustentável</p>
-        <p>Relatório gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}</p>
-    </div>
-    
-    <div class="section">
-        <h2>📊 Resumo Executivo</h2>
-        <div class="kpi-grid">
-            <div class="kpi-card">
-                <div class="kpi-value">{self.kpis_dict['tourism']['annual_visitors']:,}</div>
-                <div class="kpi-label">Visitantes Anuais</div>
-            </div>
-            <div class="kpi-card">
-                <div class="kpi-value">{self.kpis_dict['sustainability']['sustainable_percentage']}%</div>
-                <div class="kpi-label">Sites Sustentáveis</div>
-            </div>
-            <div class="kpi-card">
-                <div class="kpi-value">{self.kpis_dict['sustainability']['total_capacity']:,}</div>
-                <div class="kpi-label">Capacidade Diária</div>
-            </div>
-            <div class="kpi-card">
-                <div class="kpi-value">{self.kpis_dict['sustainability']['sustainability_score']}</div>
-                <div class="kpi-label">Score Sustentabilidade</div>
-            </div>
-        </div>
-    </div>
-    
-    <div class="section">
-        <h2>📈 Visualizações</h2>
-        {charts.get('visitors_by_province', '')}
-        {charts.get('kpi_dashboard', '')}
-    </div>
-    
-    <div class="section">
-        <h2>🏆 Top Províncias por Visitantes</h2>
-        <table style="width:100%; border-collapse: collapse;">
-            <tr style="background: #f8f9fa;">
-                <th style="padding: 10px; border: 1px solid #ddd;">Província</th>
-                <th style="padding: 10px; border: 1px solid #ddd;">Visitantes</th>
-                <th style="padding: 10px; border: 1px solid #ddd;">% Estrangeiros</th>
-                <th style="padding: 10px; border: 1px solid #ddd;">Estadia Média (noites)</th>
-            </tr>"""
-            
-            # Ordena províncias por visitantes
-            sorted_provinces = sorted(
-                self.visitor_stats['by_province'].items(),
-                key=lambda x: x[1]['total_visitors'],
-                reverse=True
-            )
-            
-            for province, data in sorted_provinces:
-                html += f"""
-            <tr>
-                <td style="padding: 10px; border: 1px solid #ddd;">{province}</td>
-                <td style="padding: 10px; border: 1px solid #ddd;">{data['total_visitors']:,}</td>
-                <td style="padding: 10px; border: 1px solid #ddd;">{data['foreign_percentage']}%</td>
-                <td style="padding: 10px; border: 1px solid #ddd;">{data['avg_stay_nights']}</td>
-            </tr>"""
-            
-            html += """
-        </table>
-    </div>
-    
-    <div style="text-align: center; color: #666; margin-top: 40px; padding: 20px;">
-        <p>SmartTour Angola - Sistema de Análise de Turismo Sustentável</p>
-        <p>Desenvolvido para o FTL Bootcamp Hackathon</p>
-    </div>
-</body>
-</html>"""
-            
-            # Salva o arquivo
             with open(filename, 'w', encoding='utf-8') as f:
-                f.write(html)
+                for chunk in self.report_chunks(data, offline, compress, title):
+                    f.write(chunk)
             
             self.logger.info(f"Relatório exportado: {filename}")
             return True
@@ -546,17 +929,45 @@ class SmartTourCore:
             self.logger.error(f"Erro ao exportar relatório: {e}")
             return False
     
+    def snapshot(self):
+        """Snapshot publicado (imutável): dados e resultados de uma mesma versão"""
+        return self.current
+    
     def get_status(self):
         """Retorna status atual do sistema (compatível com interfaces)"""
+        data = self.current
         return {
-            'data_loaded': self.data_loaded,
-            'analysis_completed': self.analysis_completed,
-            'visitor_records': len(self.visitors_df) if self.visitors_df is not None else 0,
-            'eco_sites_available': len(self.sites_df) if self.sites_df is not None else 0,
-            'provinces_available': self.visitors_df['province'].nunique() if self.visitors_df is not None else 0
+            'data_loaded': data.data_loaded,
+            'analysis_completed': data.analysis_completed,
+            'visitor_records': len(data.visitors_df) if data.data_loaded else 0,
+            'eco_sites_available': len(data.sites_df) if data.data_loaded else 0,
+            'provinces_available': len(data.province_index['visitors'])
         }
 
 
+def analyze_datasets(visitors_df, sites_df, progress=None):
+    """
+    Executa a análise completa sobre os datasets dados e devolve os resultados
+    Função de módulo para poder correr num processo do pool de tarefas
+    """
+    core = SmartTourCore()
+    core.set_data(visitors_df, sites_df)
+    if not core.perform_analysis(progress=progress):
+        raise RuntimeError("Erro na análise")
+    return core.analysis_results()
+
+
+def export_workbook(filename, data, progress=None):
+    """
+    Escreve o livro XLSX do snapshot dado e devolve o caminho
+    Função de módulo para poder correr num processo do pool de tarefas
+    """
+    core = SmartTourCore()
+    if not core.export_xlsx(filename, data, progress=progress):
+        raise RuntimeError("Erro ao exportar XLSX")
+    return filename
+
+
 # Instância global para compatibilidade com código existente
 smarttour_core = SmartTourCore()
 
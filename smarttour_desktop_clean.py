@@ -14,7 +14,9 @@ import sys
 
 # Importa o núcleo simplificado
 try:
-    from smarttour_core import SmartTourCore
+    from smarttour_core import SmartTourCore, export_workbook
+    from smarttour_batch import export_province_reports
+    from smarttour_jobs import JobManager
 except ImportError:
     print("❌ Erro: smarttour_core.py não encontrado")
     sys.exit(1)
@@ -33,6 +35,9 @@ class SmartTourDesktop:
         # Inicializa o núcleo do SmartTour
         self.smarttour = SmartTourCore()
         
+        # Tarefas em background (exportação XLSX), criadas no primeiro uso
+        self.jobs = None
+        
         # Cria interface
         self.create_interface()
         
@@ -90,6 +95,16 @@ class SmartTourDesktop:
                                  font=('Arial', 10, 'bold'), width=15, height=2)
         self.btn_open.grid(row=1, column=1, padx=5, pady=5)
         
+        self.btn_provinces = tk.Button(button_frame, text="Relatórios Províncias", 
+                                      command=self.export_province_reports, bg='#6f42c1', fg='white',
+                                      font=('Arial', 10, 'bold'), width=15, height=2)
+        self.btn_provinces.grid(row=0, column=2, padx=5, pady=5)
+        
+        self.btn_xlsx = tk.Button(button_frame, text="Exportar Excel", 
+                                 command=self.export_xlsx, bg='#20c997', fg='white',
+                                 font=('Arial', 10, 'bold'), width=15, height=2)
+        self.btn_xlsx.grid(row=1, column=2, padx=5, pady=5)
+        
         # Log
         log_frame = tk.Frame(self.root)
         log_frame.pack(fill='both', expand=True, padx=20, pady=10)
@@ -174,13 +189,13 @@ class SmartTourDesktop:
             
             # Mostra KPIs principais
             kpis = self.smarttour.kpis
-            tourism = kpis.get('tourism', {})
-            sustainability = kpis.get('sustainability', {})
+            tourism = kpis.tourism_kpis
+            sustainability = kpis.sustainability_kpis
             
             self.log("📊 Resultados principais:")
-            self.log(f"   • Visitantes anuais: {tourism.get('annual_visitors', 0):,}")
-            self.log(f"   • Sites sustentáveis: {sustainability.get('sustainable_percentage', 0)}%")
-            self.log(f"   • Score sustentabilidade: {sustainability.get('sustainability_score', 0):.1f}/10")
+            self.log(f"   • Visitantes anuais: {tourism.total_annual_visitors:,}")
+            self.log(f"   • Sites sustentáveis: {sustainability.sustainable_sites_percentage}%")
+            self.log(f"   • Score sustentabilidade: {sustainability.average_sustainability_score:.1f}/10")
             
             self.update_status("Análise concluída", '#28a745')
             messagebox.showinfo("Sucesso", "Análise concluída!")
@@ -209,7 +224,8 @@ class SmartTourDesktop:
         self.log(f"📄 Gerando relatório: {Path(filename).name}")
         self.update_status("Gerando relatório...", '#ffc107')
         
-        success = self.smarttour.export_report(filename)
+        # Autocontido: abre sem acesso à CDN do Plotly
+        success = self.smarttour.export_report(filename, offline=True)
         
         if success:
             self.log(f"✅ Relatório salvo: {filename}")
@@ -224,6 +240,85 @@ class SmartTourDesktop:
             self.update_status("Erro ao gerar", '#dc3545')
             messagebox.showerror("Erro", "Erro ao gerar relatório")
     
+    def export_province_reports(self):
+        """Exporta um relatório por província (só os que mudaram), em background"""
+        if not self.smarttour.data_loaded:
+            self.log("❌ Carregue os dados primeiro")
+            messagebox.showwarning("Aviso", "Carregue os dados primeiro!")
+            return
+        
+        output_dir = filedialog.askdirectory(title="Pasta dos relatórios por província")
+        if not output_dir:
+            return
+        
+        self.log(f"📄 Gerando relatórios por província em: {output_dir}")
+        self.run_job(export_province_reports, self.smarttour, output_dir, offline=True,
+                     button=self.btn_provinces, label="Gerando relatórios",
+                     on_done=self.province_reports_done)
+    
+    def province_reports_done(self, job):
+        if job.status != 'done':
+            self.log(f"❌ Erro nos relatórios por província: {job.error or job.status}")
+            self.update_status("Erro nos relatórios", '#dc3545')
+            messagebox.showerror("Erro", "Erro ao gerar relatórios por província")
+            return
+        
+        result = job.result
+        for province, error in result['failed'].items():
+            self.log(f"⚠️  {province}: {error}")
+        self.log(f"✅ {len(result['generated'])} gerados, {len(result['skipped'])} inalterados")
+        self.update_status("Relatórios gerados", '#28a745')
+    
+    def export_xlsx(self):
+        """Exporta as tabelas num livro XLSX (em background, sem bloquear a janela)"""
+        if not self.smarttour.data_loaded:
+            self.log("❌ Carregue os dados primeiro")
+            messagebox.showwarning("Aviso", "Carregue os dados primeiro!")
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx")],
+            title="Salvar livro Excel como..."
+        )
+        
+        if not filename:
+            return
+        
+        self.log(f"📊 Exportando Excel: {Path(filename).name}")
+        self.run_job(export_workbook, filename, self.smarttour.snapshot(), progress=True,
+                     button=self.btn_xlsx, label="Exportando Excel", on_done=self.xlsx_done)
+    
+    def xlsx_done(self, job):
+        if job.status == 'done':
+            self.log(f"✅ Livro Excel salvo: {job.result}")
+            self.update_status("Excel exportado", '#28a745')
+        else:
+            self.log(f"❌ Erro ao exportar Excel: {job.error or job.status}")
+            self.update_status("Erro ao exportar", '#dc3545')
+            messagebox.showerror("Erro", "Erro ao exportar Excel")
+    
+    def run_job(self, func, *args, button, label, on_done, progress=False, **kwargs):
+        """Executa func numa tarefa em background; o botão fica inativo até terminar"""
+        if self.jobs is None:
+            self.jobs = JobManager(workers=1, use_processes=False, timeout=3600)
+        
+        self.update_status(f"{label}...", '#ffc107')
+        button.config(state='disabled')
+        job = self.jobs.submit(func, *args, kind='export', progress=progress, **kwargs)
+        self.root.after(500, self.watch_job, job, button, label, on_done)
+    
+    def watch_job(self, job, button, label, on_done):
+        """Acompanha a tarefa no ciclo de eventos do Tk"""
+        if not job.finished:
+            percent = f" {job.progress}%" if job.progress else ""
+            self.update_status(f"{label}...{percent}", '#ffc107')
+            self.root.after(500, self.watch_job, job, button, label, on_done)
+            return
+        
+        button.config(state='normal')
+        on_done(job)
+    
     def open_report(self):
         """Abre relatório existente"""
         # Tenta arquivo padrão primeiro
@@ -249,6 +344,8 @@ class SmartTourDesktop:
         """Confirma fechamento"""
         if messagebox.askokcancel("Sair", "Deseja sair do SmartTour Angola?"):
             self.log("👋 Encerrando aplicação...")
+            if self.jobs is not None:
+                self.jobs.shutdown()
             self.root.destroy()
     
     def run(self):
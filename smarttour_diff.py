@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Comparação de Versões do Dataset
+Agregados pequenos por província e por sítio são guardados para cada
+versão carregada; comparar duas versões é alinhar esses agregados pela
+chave (província / sítio) e subtrair colunas inteiras de uma vez, sem
+voltar a correr nenhuma das análises completas. Os KPIs globais de cada
+versão só são guardados quando a análise dessa versão os publica (ou
+quando se pede uma comparação com a versão atual), nunca ao carregar.
+"""
+
+import json
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Sem orjson usa-se o módulo json da biblioteca padrão
+
+# Mesmas hipóteses da estimativa de receita de calculate_kpis
+OCCUPANCY = 0.6
+DAYS_PER_YEAR = 365
+
+PROVINCE_METRICS = ['visitors_total', 'foreign_percentage', 'avg_stay_nights',
+                    'sites_count', 'eco_capacity', 'estimated_revenue']
+SITE_METRICS = ['capacity_daily', 'fee_aoa', 'fragility_index', 'estimated_revenue']
+DIFF_PARTS = ('old', 'new', 'delta', 'pct')
+
+# Rótulos do relatório de diferenças
+LABELS = {
+    'total_annual_visitors': 'Visitantes Anuais',
+    'provinces_count': 'Províncias',
+    'foreign_visitor_percentage': '% Estrangeiros',
+    'average_stay_duration': 'Estadia Média',
+    'seasonal_variation': 'Variação Sazonal (%)',
+    'total_sites': 'Sítios',
+    'total_eco_capacity': 'Capacidade Eco',
+    'sustainable_sites_percentage': '% Sítios Sustentáveis',
+    'average_sustainability_score': 'Score Sustentabilidade',
+    'provinces_with_eco_sites': 'Províncias com Sítios',
+    'estimated_annual_revenue': 'Receita Anual (AOA)',
+    'average_site_fee': 'Taxa Média (AOA)',
+    'visitors_total': 'Visitantes',
+    'foreign_percentage': '% Estrangeiros',
+    'avg_stay_nights': 'Estadia Média',
+    'sites_count': 'Sítios',
+    'eco_capacity': 'Capacidade',
+    'estimated_revenue': 'Receita (AOA)',
+    'capacity_daily': 'Capacidade Diária',
+    'fee_aoa': 'Taxa (AOA)',
+    'fragility_index': 'Fragilidade'
+}
+STATUS_LABELS = {'added': 'Novo', 'removed': 'Removido', 'changed': 'Alterado', 'unchanged': 'Sem alteração'}
+
+
+@dataclass(slots=True, frozen=True)
+class VersionAggregates:
+    """Agregados de uma versão do dataset (dezenas de linhas, não os dados brutos)"""
+    dataset_version: str
+    provinces: pd.DataFrame
+    sites: pd.DataFrame
+    summary: dict = None  # KPIs globais; None até a versão ser analisada
+
+    def with_summary(self, kpis):
+        """Cópia com os KPIs globais (modelo de smarttour_kpis) desta versão"""
+        return replace(self, summary=kpi_values(kpis))
+
+
+def site_aggregates(sites_df):
+    sites = sites_df.drop_duplicates('site_name', keep='last').set_index('site_name')
+    table = sites[['province', 'capacity_daily', 'fee_aoa', 'fragility_index']].copy()
+    table['estimated_revenue'] = (table['capacity_daily'] * table['fee_aoa'] * DAYS_PER_YEAR * OCCUPANCY).round()
+    return table
+
+
+def province_aggregates(visitors_df, sites):
+    visitors = visitors_df.groupby('province', sort=False).agg(
+        visitors_total=('visitors_total', 'sum'),
+        foreign_percentage=('foreign_share', 'mean'),
+        avg_stay_nights=('avg_stay_nights', 'mean')
+    )
+    visitors['foreign_percentage'] = (visitors['foreign_percentage'] * 100).round(1)
+    visitors['avg_stay_nights'] = visitors['avg_stay_nights'].round(1)
+
+    by_site = sites.groupby('province', sort=False).agg(
+        sites_count=('capacity_daily', 'size'),
+        eco_capacity=('capacity_daily', 'sum'),
+        estimated_revenue=('estimated_revenue', 'sum')
+    )
+    table = visitors.join(by_site, how='outer')
+    table[['sites_count', 'eco_capacity', 'estimated_revenue']] = \
+        table[['sites_count', 'eco_capacity', 'estimated_revenue']].fillna(0)
+    return table[PROVINCE_METRICS]
+
+
+def kpi_values(kpis):
+    """KPIs (modelo de smarttour_kpis) num dict plano {nome: valor}"""
+    if kpis is None:
+        return {}
+    return {name: value for group in kpis.to_dict().values() for name, value in group.items()}
+
+
+def aggregate_version(dataset_version, visitors_df, sites_df):
+    """
+    Agregados por província e por sítio de uma versão; os KPIs globais
+    ficam de fora (with_summary, com os KPIs de SmartTourCore.calculate_kpis)
+    """
+    sites = site_aggregates(sites_df)
+    return VersionAggregates(
+        dataset_version=dataset_version,
+        provinces=province_aggregates(visitors_df, sites),
+        sites=sites
+    )
+
+
+def aligned_diff(old, new, metrics):
+    """
+    Junta os dois agregados pela chave (união das chaves) e calcula, por
+    coluna inteira, antigo/novo/delta/% e o estado de cada linha
+    """
+    keys = old.index.union(new.index, sort=False)
+    old_values = old.reindex(keys)[metrics].to_numpy(dtype=np.float64)
+    new_values = new.reindex(keys)[metrics].to_numpy(dtype=np.float64)
+    delta = new_values - old_values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(old_values != 0, delta / np.abs(old_values) * 100, np.nan)
+
+    in_old = keys.isin(old.index)
+    in_new = keys.isin(new.index)
+    changed = np.any(np.abs(np.nan_to_num(delta)) > 1e-9, axis=1)
+    status = np.select([~in_old, ~in_new, changed], ['added', 'removed', 'changed'], 'unchanged')
+
+    # Colunas <métrica>_old, _new, _delta, _pct (por esta ordem, métrica a métrica)
+    columns = [f'{metric}_{part}' for metric in metrics for part in DIFF_PARTS]
+    values = np.stack([old_values, new_values, delta, np.round(pct, 1)], axis=2).reshape(len(keys), -1)
+    table = pd.DataFrame(values, index=keys, columns=columns)
+    table.insert(0, 'status', status)
+    return table
+
+
+def rows_payload(table, metrics, include_unchanged=False):
+    """Linhas compactas: só as métricas que mudaram, como [antigo, novo, delta, %]"""
+    if not include_unchanged:
+        table = table[table['status'] != 'unchanged']
+    values = table.drop(columns='status').to_numpy(dtype=object).reshape(len(table), len(metrics), len(DIFF_PARTS))
+
+    rows = []
+    for key, status, metric_values in zip(table.index, table['status'], values):
+        changes = {}
+        for metric, (old, new, delta, pct) in zip(metrics, metric_values):
+            if status == 'changed' and abs(delta) <= 1e-9:
+                continue
+            changes[metric] = [None if pd.isna(v) else float(v) for v in (old, new, delta, pct)]
+        rows.append({'key': key, 'status': status, 'changes': changes})
+    return rows
+
+
+@dataclass(slots=True, frozen=True)
+class DatasetDiff:
+    """Diferenças entre duas versões: KPIs globais, províncias e sítios"""
+    base: str
+    target: str
+    summary: dict
+    provinces: pd.DataFrame
+    sites: pd.DataFrame
+
+    def counts(self, table):
+        return {status: int(n) for status, n in table['status'].value_counts().items()}
+
+    def to_dict(self, include_unchanged=False):
+        return {
+            'base': self.base,
+            'target': self.target,
+            'summary': self.summary,
+            'provinces': {'counts': self.counts(self.provinces),
+                          'rows': rows_payload(self.provinces, PROVINCE_METRICS, include_unchanged)},
+            'sites': {'counts': self.counts(self.sites),
+                      'rows': rows_payload(self.sites, SITE_METRICS, include_unchanged)}
+        }
+
+    def to_json(self, include_unchanged=False):
+        """JSON compacto em bytes (UTF-8)"""
+        payload = self.to_dict(include_unchanged)
+        if orjson is not None:
+            return orjson.dumps(payload)
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compare(base, target):
+    """
+    Compara os agregados de duas versões (VersionAggregates)
+    KPIs de uma versão nunca analisada ficam vazios (None) no resumo
+    """
+    base_summary, target_summary = base.summary or {}, target.summary or {}
+    summary = {}
+    for name in target_summary or base_summary:
+        old, new = base_summary.get(name), target_summary.get(name)
+        delta = None if old is None or new is None else round(new - old, 2)
+        pct = round(delta / abs(old) * 100, 1) if old and delta is not None else None
+        summary[name] = [old, new, delta, pct]
+
+    return DatasetDiff(
+        base=base.dataset_version,
+        target=target.dataset_version,
+        summary=summary,
+        provinces=aligned_diff(base.provinces, target.provinces, PROVINCE_METRICS),
+        sites=aligned_diff(base.sites, target.sites, SITE_METRICS)
+    )
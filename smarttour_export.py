@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Exportação de Tabelas em Streaming
+CSV e NDJSON gerados bloco a bloco, com projeção de colunas e filtros,
+e livros XLSX com várias folhas escritos linha a linha (openpyxl em modo
+write-only), para que exportações grandes usem memória constante
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+from openpyxl import Workbook
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+CHUNK_ROWS = 10_000  # Linhas por bloco enviado
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+MAX_SHEET_ROWS = 1_048_575  # Limite do Excel (1 048 576) menos o cabeçalho
+
+
+def parse_columns(table, columns):
+    """Lista de colunas pedida ('a,b,c'); None mantém todas"""
+    if not columns:
+        return list(table.columns)
+    selected = [c.strip() for c in columns.split(',') if c.strip()]
+    unknown = [c for c in selected if c not in table.columns]
+    if unknown:
+        raise ValueError(f"Colunas desconhecidas: {', '.join(unknown)}")
+    return selected
+
+
+def parse_filters(table, args, reserved=('format', 'columns')):
+    """
+    Filtros a partir dos parâmetros do pedido:
+      coluna=v1,v2   -> valor em {v1, v2}
+      min_coluna=v   -> coluna >= v
+      max_coluna=v   -> coluna <= v
+    Os valores são convertidos para o tipo da coluna.
+    """
+    filters = []
+    for key, value in args.items():
+        if key in reserved:
+            continue
+        op, column = 'in', key
+        if key.startswith(('min_', 'max_')) and key[4:] in table.columns:
+            op, column = key[:3], key[4:]
+        if column not in table.columns:
+            raise ValueError(f"Filtro desconhecido: {key}")
+
+        values = value.split(',') if op == 'in' else [value]
+        dtype = table[column].dtype
+        try:
+            if pd.api.types.is_datetime64_any_dtype(dtype):
+                values = list(pd.to_datetime(values))
+            elif pd.api.types.is_numeric_dtype(dtype):
+                values = list(pd.to_numeric(values))
+        except (ValueError, TypeError):
+            raise ValueError(f"Valor inválido para {column}: {value}")
+
+        filters.append((column, op, values if op == 'in' else values[0]))
+    return filters
+
+
+def filter_mask(chunk, filters):
+    mask = pd.Series(True, index=chunk.index)
+    for column, op, value in filters:
+        if op == 'in':
+            mask &= chunk[column].isin(value)
+        elif op == 'min':
+            mask &= chunk[column] >= value
+        else:
+            mask &= chunk[column] <= value
+    return mask
+
+
+def encode_chunk(chunk, fmt, header=False):
+    if fmt == 'csv':
+        return chunk.to_csv(index=False, header=header, date_format='%Y-%m-%d')
+    if chunk.empty:
+        return ''
+    lines = chunk.to_json(orient='records', lines=True, date_format='iso', force_ascii=False)
+    # O pandas atual já termina com '\n' (versões antigas não): uma linha por registo, sem linhas vazias
+    return lines if lines.endswith('\n') else lines + '\n'
+
+
+def stream_table(table, fmt='csv', columns=None, filters=(), chunk_rows=CHUNK_ROWS):
+    """
+    Gerador de blocos de texto da tabela filtrada e projetada
+    Filtra e codifica um bloco de cada vez (sem cópia da tabela inteira);
+    o cabeçalho CSV sai imediatamente, antes de qualquer linha
+    """
+    columns = columns or list(table.columns)
+    if fmt == 'csv':
+        yield encode_chunk(table.iloc[:0][columns], fmt, header=True)
+
+    for start in range(0, len(table), chunk_rows):
+        chunk = table.iloc[start:start + chunk_rows]
+        if filters:
+            chunk = chunk[filter_mask(chunk, filters)]
+        if not chunk.empty:
+            yield encode_chunk(chunk[columns], fmt)
+
+
+def sheet_rows(table, chunk_rows=CHUNK_ROWS):
+    """Linhas como tuplos Python, um bloco de cada vez (NaN/NaT passam a células vazias)"""
+    for start in range(0, len(table), chunk_rows):
+        chunk = table.iloc[start:start + chunk_rows].astype(object)
+        yield from chunk.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def write_xlsx(path, sheets, progress=None, chunk_rows=CHUNK_ROWS, max_sheet_rows=MAX_SHEET_ROWS):
+    """
+    Escreve [(nome, DataFrame), ...] num livro XLSX com uma folha por tabela
+    O modo write-only envia cada linha para o ficheiro ao ser adicionada, por
+    isso a memória não cresce com o número de linhas; tabelas acima do limite
+    do Excel continuam em folhas 'nome (2)', 'nome (3)', ...
+    A escrita é atómica (ficheiro temporário + os.replace)
+    """
+    total = sum(len(table) for _, table in sheets) or 1
+    written = 0
+
+    workbook = Workbook(write_only=True)
+    for name, table in sheets:
+        if progress:
+            progress(round(written / total * 100), f'Folha {name}...')
+        part, rows_in_sheet, sheet = 1, 0, None
+        for row in sheet_rows(table, chunk_rows):
+            if sheet is None or rows_in_sheet >= max_sheet_rows:
+                title = name if part == 1 else f'{name[:26]} ({part})'
+                sheet = workbook.create_sheet(title=title[:31])
+                sheet.append([str(column) for column in table.columns])
+                part, rows_in_sheet = part + 1, 0
+            sheet.append(row)
+            rows_in_sheet += 1
+            written += 1
+            if progress and written % chunk_rows == 0:
+                progress(round(written / total * 100), f'Folha {name}: {rows_in_sheet:,} linhas')
+        if sheet is None:
+            workbook.create_sheet(title=name[:31]).append([str(column) for column in table.columns])
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp-', suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook.save(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    if progress:
+        progress(100, 'Exportação concluída')
+    return path
+
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Camada Geográfica
+Geração de GeoJSON dos sítios ecológicos e agregados por província
+e grelhas de densidade (heatmap) sobre Angola
+"""
+
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None  # Sem scipy a matriz de atribuição fica densa
+
+# Limites aproximados de Angola (lat_min, lat_max, lon_min, lon_max)
+ANGOLA_BOUNDS = (-18.1, -4.3, 11.6, 24.1)
+
+# Resoluções (graus) das grelhas de densidade: pedidos são arredondados à mais
+# próxima, por isso há no máximo uma grelha em cache por valor desta lista
+HEATMAP_RESOLUTIONS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+
+# Capitais provinciais (lat, lon), origem dos fluxos no modelo gravitacional
+PROVINCE_CAPITALS = {
+    'Bengo': (-8.58, 13.66),
+    'Benguela': (-12.58, 13.41),
+    'Bié': (-12.38, 16.94),
+    'Cabinda': (-5.55, 12.20),
+    'Cuando Cubango': (-14.66, 17.69),
+    'Cuanza Norte': (-9.30, 14.91),
+    'Cuanza Sul': (-11.21, 13.84),
+    'Cunene': (-17.07, 15.73),
+    'Huambo': (-12.78, 15.74),
+    'Huíla': (-14.92, 13.49),
+    'Luanda': (-8.84, 13.23),
+    'Lunda Norte': (-7.38, 20.83),
+    'Lunda Sul': (-9.66, 20.39),
+    'Malanje': (-9.54, 16.34),
+    'Moxico': (-11.78, 19.92),
+    'Namibe': (-15.20, 12.15),
+    'Uíge': (-7.61, 15.06),
+    'Zaire': (-6.27, 14.24)
+}
+
+# Parâmetros do modelo gravitacional
+GRAVITY_PARAMS = {
+    'capacity_exponent': 1.0,   # Atratividade cresce com a capacidade
+    'fee_exponent': 0.5,        # ... e diminui com a taxa cobrada
+    'distance_decay': 2.0,      # Decaimento com a distância (km)
+    'distance_offset_km': 10.0, # Evita divisão por zero para sítios na capital
+    'max_distance_km': 500.0    # Para além disto não há fluxo (matriz esparsa)
+}
+
+def _clean(value):
+    """Converte tipos numpy para tipos nativos serializáveis em JSON"""
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def build_geojson(sites_df, visitors_df):
+    """
+    Cria FeatureCollection com um ponto por sítio ecológico e um ponto por
+    província (centróide dos seus sítios) com os agregados de visitantes.
+    Províncias sem sítios ficam com geometria nula.
+    """
+    features = []
+
+    for site in sites_df.itertuples(index=False):
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [_clean(site.lon), _clean(site.lat)]},
+            'properties': {
+                'kind': 'site',
+                'name': site.site_name,
+                'province': site.province,
+                'fragility_index': _clean(site.fragility_index),
+                'capacity_daily': _clean(site.capacity_daily),
+                'fee_aoa': _clean(site.fee_aoa)
+            }
+        })
+
+    visitors = visitors_df.groupby('province').agg(
+        total_visitors=('visitors_total', 'sum'),
+        avg_foreign_share=('foreign_share', 'mean'),
+        avg_stay_nights=('avg_stay_nights', 'mean')
+    )
+    centroids = sites_df.groupby('province').agg(
+        lat=('lat', 'mean'),
+        lon=('lon', 'mean'),
+        sites_count=('site_name', 'size')
+    )
+    provinces = visitors.join(centroids, how='outer')
+
+    for province, row in provinces.iterrows():
+        geometry = None
+        if not pd.isna(row['lat']):
+            geometry = {'type': 'Point', 'coordinates': [round(row['lon'], 4), round(row['lat'], 4)]}
+        features.append({
+            'type': 'Feature',
+            'geometry': geometry,
+            'properties': {
+                'kind': 'province',
+                'name': province,
+                'total_visitors': int(row['total_visitors']) if not pd.isna(row['total_visitors']) else 0,
+                'avg_foreign_share': None if pd.isna(row['avg_foreign_share']) else round(row['avg_foreign_share'], 3),
+                'avg_stay_nights': None if pd.isna(row['avg_stay_nights']) else round(row['avg_stay_nights'], 2),
+                'sites_count': int(row['sites_count']) if not pd.isna(row['sites_count']) else 0
+            }
+        })
+
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def encode_geojson(collection):
+    """Serializa o GeoJSON em bytes compactos e na variante gzip"""
+    raw = json.dumps(collection, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return raw, gzip.compress(raw, compresslevel=9, mtime=0)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distância em km entre pontos (arrays com broadcasting)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * np.arcsin(np.sqrt(a))
+
+
+def province_origins(provinces, sites_df):
+    """Coordenadas de origem por província (capital ou centróide dos sítios)"""
+    centroids = sites_df.groupby('province')[['lat', 'lon']].mean()
+    origins = {}
+    for province in provinces:
+        if province in PROVINCE_CAPITALS:
+            origins[province] = PROVINCE_CAPITALS[province]
+        elif province in centroids.index:
+            origins[province] = tuple(centroids.loc[province])
+    return origins
+
+
+def gravity_matrix(provinces, sites_df, params=GRAVITY_PARAMS):
+    """
+    Matriz P x S com a fração dos visitantes de cada província que vai
+    para cada sítio (linhas somam 1, ou 0 se não há sítios ao alcance)
+    """
+    origins = province_origins(provinces, sites_df)
+    origin = np.array([origins.get(p, (np.nan, np.nan)) for p in provinces], dtype=float)
+
+    distance = haversine_km(origin[:, [0]], origin[:, [1]],
+                            sites_df['lat'].to_numpy(dtype=float)[None, :],
+                            sites_df['lon'].to_numpy(dtype=float)[None, :])
+
+    attractiveness = (sites_df['capacity_daily'].to_numpy(dtype=float) ** params['capacity_exponent']
+                      * sites_df['fee_aoa'].clip(lower=1).to_numpy(dtype=float) ** -params['fee_exponent'])
+    weights = attractiveness / (distance + params['distance_offset_km']) ** params['distance_decay']
+    weights[~(distance <= params['max_distance_km'])] = 0.0
+
+    totals = weights.sum(axis=1, keepdims=True)
+    weights = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+    return sparse.csr_matrix(weights) if sparse is not None else weights
+
+
+def attribute_visitors(visitors_df, sites_df, params=GRAVITY_PARAMS):
+    """
+    Reparte os visitantes de cada província-mês pelos sítios
+
+    Todo o histórico é tratado num único produto matricial:
+    (meses x províncias) @ (províncias x sítios) -> (meses x sítios)
+    """
+    monthly = visitors_df.pivot_table(index='date', columns='province',
+                                      values='visitors_total', aggfunc='sum', fill_value=0)
+    weights = gravity_matrix(list(monthly.columns), sites_df, params)
+
+    if sparse is not None:
+        attributed = np.asarray((weights.T @ monthly.to_numpy(dtype=float).T).T)
+    else:
+        attributed = monthly.to_numpy(dtype=float) @ weights
+
+    return pd.DataFrame(attributed, index=monthly.index, columns=sites_df['site_name'].tolist())
+
+
+def snap_resolution(resolution):
+    """Resolução permitida mais próxima da pedida"""
+    return min(HEATMAP_RESOLUTIONS, key=lambda allowed: abs(allowed - float(resolution)))
+
+
+def density_grid(lat, lon, weights, resolution=0.5, bounds=ANGOLA_BOUNDS):
+    """Grelha 2D (lat x lon) com a soma dos pesos por célula de `resolution` graus"""
+    lat_min, lat_max, lon_min, lon_max = bounds
+    lat_edges = np.arange(lat_min, lat_max + resolution, resolution)
+    lon_edges = np.arange(lon_min, lon_max + resolution, resolution)
+    grid, _, _ = np.histogram2d(lat, lon, bins=[lat_edges, lon_edges], weights=weights)
+    return grid, lat_edges, lon_edges
+
+
+def build_heatmap(sites_df, demand, resolution=0.5, bounds=ANGOLA_BOUNDS):
+    """
+    Camadas de densidade de capacidade eco e de pressão de visitantes
+    Só as células não vazias são devolvidas, para manter o payload pequeno
+    """
+    lat = sites_df['lat'].to_numpy(dtype=float)
+    lon = sites_df['lon'].to_numpy(dtype=float)
+
+    capacity, lat_edges, lon_edges = density_grid(lat, lon, sites_df['capacity_daily'].to_numpy(dtype=float), resolution, bounds)
+    demand_grid, _, _ = density_grid(lat, lon, demand, resolution, bounds)
+
+    # Pressão: procura diária atribuída face à capacidade diária da célula
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pressure = np.where(capacity > 0, demand_grid / 30 / capacity, 0.0)
+
+    rows, cols = np.nonzero(capacity)
+    return {
+        'resolution': resolution,
+        'bounds': list(bounds),
+        'cells': [
+            {
+                'lat': round(float(lat_edges[i]), 4),
+                'lon': round(float(lon_edges[j]), 4),
+                'capacity': int(capacity[i, j]),
+                'demand': int(demand_grid[i, j]),
+                'pressure': round(float(pressure[i, j]), 3)
+            }
+            for i, j in zip(rows, cols)
+        ]
+    }
@@ -18,6 +18,9 @@ import base64
 from io import BytesIO
 import os
 
+from smarttour_charts import figure_cache, render_html, chart_placeholder, offline_bundle
+from smarttour_report import render_report, trusted
+
 class SmartTourAngola:
     """Sistema completo de análise de turismo sustentável para Angola"""
     
@@ -310,85 +313,100 @@ class SmartTourAngola:
                 for name, data in sorted_provinces
             }
     
-    def create_visualizations(self):
-        """Cria visualizações principais"""
-        visualizations = {}
+    def visualization_specs(self):
+        """Especificações JSON das visualizações (figuras repetidas vêm da cache)"""
+        specs = {}
         
         try:
             # Gráfico de visitantes por província
             if 'provinces' in self.visitor_insights:
-                provinces = list(self.visitor_insights['provinces'].keys())
-                visitors = [data['total_visitors'] for data in self.visitor_insights['provinces'].values()]
-                
-                fig = go.Figure()
-                fig.add_trace(go.Bar(
-                    x=provinces,
-                    y=visitors,
-                    marker_color=self.angola_colors['primary'],
-                    text=[f"{v:,}" for v in visitors],
-                    textposition='outside'
-                ))
-                
-                fig.update_layout(
-                    title='Visitantes por Província',
-                    xaxis_title='Província',
-                    yaxis_title='Número de Visitantes',
-                    template='plotly_white'
-                )
-                
-                visualizations['province_visitors'] = fig.to_html(include_plotlyjs='cdn')
+                specs['province_visitors'] = figure_cache.spec('province_visitors', {
+                    'provinces': list(self.visitor_insights['provinces'].keys()),
+                    'visitors': [data['total_visitors'] for data in self.visitor_insights['provinces'].values()],
+                    'color': self.angola_colors['primary']
+                }, self.build_province_visitors)
             
             # Dashboard de KPIs
-            fig = make_subplots(
-                rows=2, cols=2,
-                subplot_titles=('Visitantes vs Capacidade', 'Score Sustentabilidade', 'Distribuição Sazonal', 'KPIs Econômicos'),
-                specs=[[{'type': 'bar'}, {'type': 'indicator'}], [{'type': 'pie'}, {'type': 'bar'}]]
-            )
-            
-            # Visitantes vs Capacidade
-            tourism_kpis = self.kpis.get('tourism_kpis', {})
-            sustainability_kpis = self.kpis.get('sustainability_kpis', {})
-            
-            fig.add_trace(go.Bar(
-                x=['Visitantes Anuais', 'Capacidade Anual'],
-                y=[tourism_kpis.get('total_annual_visitors', 0), 
-                   sustainability_kpis.get('total_eco_capacity', 0) * 365],
-                marker_color=[self.angola_colors['primary'], self.angola_colors['accent']]
-            ), row=1, col=1)
-            
-            # Score de sustentabilidade
-            fig.add_trace(go.Indicator(
-                mode="gauge+number",
-                value=sustainability_kpis.get('average_sustainability_score', 0),
-                title={'text': "Sustentabilidade"},
-                gauge={'axis': {'range': [None, 10]}, 'bar': {'color': self.angola_colors['success']}}
-            ), row=1, col=2)
-            
-            # Distribuição sazonal
-            if 'seasonal_patterns' in self.visitor_insights:
-                seasonal = self.visitor_insights['seasonal_patterns']
-                fig.add_trace(go.Pie(
-                    labels=['Época Alta', 'Época Baixa'],
-                    values=[seasonal['peak_season']['total_visitors'], seasonal['offpeak_season']['total_visitors']],
-                    marker_colors=[self.angola_colors['primary'], self.angola_colors['accent']]
-                ), row=2, col=1)
-            
-            # KPIs econômicos
-            economic_kpis = self.kpis.get('economic_kpis', {})
-            fig.add_trace(go.Bar(
-                x=['Receita (M AOA)', 'Taxa Média (K AOA)'],
-                y=[economic_kpis.get('estimated_annual_revenue', 0) / 1000000,
-                   economic_kpis.get('average_site_fee', 0) / 1000],
-                marker_color=self.angola_colors['info']
-            ), row=2, col=2)
-            
-            fig.update_layout(title='Dashboard SmartTour Angola', height=700, showlegend=False)
-            visualizations['kpi_dashboard'] = fig.to_html(include_plotlyjs='cdn')
+            seasonal = self.visitor_insights.get('seasonal_patterns')
+            specs['kpi_dashboard'] = figure_cache.spec('integrated_kpi_dashboard', {
+                'tourism_kpis': self.kpis.get('tourism_kpis', {}),
+                'sustainability_kpis': self.kpis.get('sustainability_kpis', {}),
+                'economic_kpis': self.kpis.get('economic_kpis', {}),
+                'seasonal': seasonal and [seasonal['peak_season']['total_visitors'],
+                                          seasonal['offpeak_season']['total_visitors']],
+                'colors': self.angola_colors
+            }, self.build_kpi_dashboard)
             
         except Exception as e:
             self.logger.error(f"Erro ao criar visualizações: {e}")
         
-        return visualizations
+        return specs
+    
+    def create_visualizations(self):
+        """Cria visualizações principais em HTML (Plotly via CDN)"""
+        return {name: render_html(spec, name) for name, spec in self.visualization_specs().items()}
+    
+    @staticmethod
+    def build_province_visitors(provinces, visitors, color):
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            x=provinces,
+            y=visitors,
+            marker_color=color,
+            text=[f"{v:,}" for v in visitors],
+            textposition='outside'
+        ))
+        
+        fig.update_layout(
+            title='Visitantes por Província',
+            xaxis_title='Província',
+            yaxis_title='Número de Visitantes',
+            template='plotly_white'
+        )
+        return fig
+    
+    @staticmethod
+    def build_kpi_dashboard(tourism_kpis, sustainability_kpis, economic_kpis, seasonal, colors):
+        fig = make_subplots(
+            rows=2, cols=2,
+            subplot_titles=('Visitantes vs Capacidade', 'Score Sustentabilidade', 'Distribuição Sazonal', 'KPIs Econômicos'),
+            specs=[[{'type': 'bar'}, {'type': 'indicator'}], [{'type': 'pie'}, {'type': 'bar'}]]
+        )
+        
+        # Visitantes vs Capacidade
+        fig.add_trace(go.Bar(
+            x=['Visitantes Anuais', 'Capacidade Anual'],
+            y=[tourism_kpis.get('total_annual_visitors', 0), 
+               sustainability_kpis.get('total_eco_capacity', 0) * 365],
+            marker_color=[colors['primary'], colors['accent']]
+        ), row=1, col=1)
+        
+        # Score de sustentabilidade
+        fig.add_trace(go.Indicator(
+            mode="gauge+number",
+            value=sustainability_kpis.get('average_sustainability_score', 0),
+            title={'text': "Sustentabilidade"},
+            gauge={'axis': {'range': [None, 10]}, 'bar': {'color': colors['success']}}
+        ), row=1, col=2)
+        
+        # Distribuição sazonal
+        if seasonal:
+            fig.add_trace(go.Pie(
+                labels=['Época Alta', 'Época Baixa'],
+                values=seasonal,
+                marker_colors=[colors['primary'], colors['accent']]
+            ), row=2, col=1)
+        
+        # KPIs econômicos
+        fig.add_trace(go.Bar(
+            x=['Receita (M AOA)', 'Taxa Média (K AOA)'],
+            y=[economic_kpis.get('estimated_annual_revenue', 0) / 1000000,
+               economic_kpis.get('average_site_fee', 0) / 1000],
+            marker_color=colors['info']
+        ), row=2, col=2)
+        
+        fig.update_layout(title='Dashboard SmartTour Angola', height=700, showlegend=False)
+        return fig
     
     def get_status(self):
         """Retorna status detalhado do sistema"""
@@ -417,97 +435,49 @@ class SmartTourAngola:
         
         return status
     
-    def export_report(self, filename="smarttour_angola_report.html"):
-        """Exporta relatório HTML completo"""
+    def export_report(self, filename="smarttour_angola_report.html", offline=False, compress=False):
+        """
+        Exporta relatório HTML completo (template compilado, escrito em streaming);
+        offline=True embute o runtime Plotly uma vez (comprimido com compress=True)
+        seguido das especificações compactas
+        """
         if not self.analysis_completed:
             return False
         
         try:
-            visualizations = self.create_visualizations()
+            if offline:
+                specs = self.visualization_specs()
+                charts = [chart_placeholder(name) for name in specs]
+                bundle = offline_bundle(specs, compress)
+            else:
+                charts = list(self.create_visualizations().values())
+                bundle = ''
             
-            html_content = f"""
-<!DOCTYPE html>
-<html lang="pt">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>SmartTour Angola - Relatório</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }}
-        .header {{ background: linear-gradient(135deg, #CE1126, #FFCD00); color: white; 
-                   padding: 30px; text-align: center; border-radius: 10px; margin-bottom: 20px; }}
-        .section {{ background: white; margin: 20px 0; padding: 25px; border-radius: 10px; 
-                   box-shadow: 0 2px 5px rgba(0,0,0,0.1); }}
-        .kpi-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); 
-                    gap: 20px; margin: 20px 0; }}
-        .kpi-card {{ background: #f8f9fa; padding: 20px; border-radius: 8px; text-align: center; }}
-        .kpi-value {{ font-size: 2em; font-weight: bold; color: #CE1126; }}
-        h1, h2 {{ color: #333; }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>🇦🇴 SmartTour Angola</h1>
-        <p>Sistema de Análise de Turismo Sustentável</p>
-        <p>Relatório gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}</p>
-    </div>
-    
-    <div class="section">
-        <h2>📊 Resumo Executivo</h2>
-        <div class="kpi-grid">
-            <div class="kpi-card">
-                <div class="kpi-value">{self.kpis.get('tourism_kpis', {}).get('total_annual_visitors', 0):,}</div>
-                <div>Visitantes Anuais</div>
-            </div>
-            <div class="kpi-card">
-                <div class="kpi-value">{self.kpis.get('sustainability_kpis', {}).get('sustainable_sites_percentage', 0)}%</div>
-                <div>Sites Sustentáveis</div>
-            </div>
-            <div class="kpi-card">
-                <div class="kpi-value">{self.kpis.get('sustainability_kpis', {}).get('total_eco_capacity', 0):,}</div>
-                <div>Capacidade Diária</div>
-            </div>
-            <div class="kpi-card">
-                <div class="kpi-value">{self.kpis.get('sustainability_kpis', {}).get('average_sustainability_score', 0):.1f}</div>
-                <div>Score Sustentabilidade</div>
-            </div>
-        </div>
-        
-        <h3>🎯 Principais Achados:</h3>
-        <ul>{"".join([f"<li>{finding}</li>" for finding in self.summary_report.get('executive_summary', {}).get('key_findings', [])])}</ul>
-        
-        <h3>💡 Recomendações:</h3>
-        <ul>{"".join([f"<li>{rec}</li>" for rec in self.summary_report.get('executive_summary', {}).get('recommendations', [])])}</ul>
-    </div>
-    
-    <div class="section">
-        <h2>📈 Visualizações</h2>
-        {visualizations.get('province_visitors', '')}
-        {visualizations.get('kpi_dashboard', '')}
-    </div>
-    
-    <div class="section">
-        <h2>🏆 Top Províncias</h2>
-        <table style="width:100%; border-collapse: collapse;">
-            <tr style="background: #f8f9fa;">
-                <th style="padding: 10px; border: 1px solid #ddd;">Província</th>
-                <th style="padding: 10px; border: 1px solid #ddd;">Visitantes</th>
-                <th style="padding: 10px; border: 1px solid #ddd;">% Estrangeiros</th>
-                <th style="padding: 10px; border: 1px solid #ddd;">Estadia Média</th>
-            </tr>
-            {"".join([f'<tr><td style="padding: 10px; border: 1px solid #ddd;">{province}</td><td style="padding: 10px; border: 1px solid #ddd;">{data["visitors"]:,}</td><td style="padding: 10px; border: 1px solid #ddd;">{data["foreign_share"]}%</td><td style="padding: 10px; border: 1px solid #ddd;">{data["avg_stay"]:.1f}</td></tr>' for province, data in self.summary_report.get('top_provinces', {}).items()])}
-        </table>
-    </div>
-    
-    <div style="text-align: center; color: #666; margin-top: 40px;">
-        <p>SmartTour Angola - Desenvolvido para FTL Bootcamp</p>
-    </div>
-</body>
-</html>
-            """
+            tourism_kpis = self.kpis.get('tourism_kpis', {})
+            sustainability_kpis = self.kpis.get('sustainability_kpis', {})
+            executive_summary = self.summary_report.get('executive_summary', {})
+            
+            chunks = render_report(
+                'integrated',
+                generated=datetime.now().strftime('%d/%m/%Y %H:%M'),
+                kpi_cards=[
+                    ('Visitantes Anuais', f"{tourism_kpis.get('total_annual_visitors', 0):,}"),
+                    ('Sites Sustentáveis', f"{sustainability_kpis.get('sustainable_sites_percentage', 0)}%"),
+                    ('Capacidade Diária', f"{sustainability_kpis.get('total_eco_capacity', 0):,}"),
+                    ('Score Sustentabilidade', f"{sustainability_kpis.get('average_sustainability_score', 0):.1f}")
+                ],
+                findings=executive_summary.get('key_findings', []),
+                recommendations=executive_summary.get('recommendations', []),
+                charts=[trusted(chart) for chart in charts],
+                provinces=({'province': province, 'visitors': data['visitors'], 'foreign': data['foreign_share'],
+                            'stay': f"{data['avg_stay']:.1f}"}
+                           for province, data in self.summary_report.get('top_provinces', {}).items()),
+                stay_label='Estadia Média',
+                bundle=trusted(bundle)
+            )
             
             with open(filename, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+                f.writelines(chunks)
             
             self.logger.info(f"Relatório exportado: {filename}")
             return True
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Sistema de Tarefas
+Fila limitada e pool fixo de workers (processos) para o trabalho pesado,
+com identificadores, cancelamento, timeouts e métricas, coalescência de
+pedidos idênticos (single-flight) e limites de pedidos por cliente.
+Cada thread de despacho tem o seu processo worker: uma tarefa cancelada ou
+fora do tempo limite termina esse processo, que é recriado para a seguinte.
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import numpy as np
+
+
+class QueueFull(Exception):
+    """A fila de tarefas atingiu o limite"""
+
+
+class ProgressReporter:
+    """
+    Callback progress(percentagem, mensagem) passado às tarefas
+    Serializável, envia os eventos pelo canal de progresso do JobManager
+    """
+
+    def __init__(self, channel, job_id):
+        self.channel = channel
+        self.job_id = job_id
+
+    def __call__(self, percent, message=''):
+        self.channel.put((self.job_id, percent, message))
+
+
+def worker_loop(conn):
+    """Ciclo de um processo worker: recebe (func, args, kwargs) e devolve (ok, resultado ou erro)"""
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        func, args, kwargs = task
+        try:
+            reply = (True, func(*args, **kwargs))
+        except Exception as e:
+            reply = (False, str(e))
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Resultado não serializável
+            conn.send((False, str(e)))
+
+
+class WorkerProcess:
+    """
+    Processo worker dedicado a uma thread de despacho (uma tarefa de cada vez)
+    Mantém-se vivo entre tarefas; stop() termina-o a meio de uma tarefa
+    """
+
+    def __init__(self):
+        self.process = None
+        self.conn = None
+
+    def submit(self, func, args, kwargs):
+        if self.process is None or not self.process.is_alive():
+            self._start()
+        self.conn.send((func, args, kwargs))
+
+    def wait(self, timeout):
+        """True quando há resposta; erro se o processo morreu sem responder"""
+        if self.conn.poll(timeout):
+            return True
+        if not self.process.is_alive():
+            self.stop()
+            raise RuntimeError('O processo worker terminou inesperadamente')
+        return False
+
+    def result(self):
+        ok, value = self.conn.recv()
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def stop(self):
+        """Termina o processo (e a tarefa em curso); o próximo submit cria outro"""
+        if self.process is None:
+            return
+        self.process.terminate()
+        self.process.join(2)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = self.conn = None
+
+    def _start(self):
+        parent, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=worker_loop, args=(child,), name='smarttour-worker')
+        self.process.start()
+        child.close()
+        self.conn = parent
+
+
+class WorkerThread:
+    """
+    Equivalente em thread (use_processes=False) para tarefas leves
+    Uma thread não pode ser interrompida: em stop() a tarefa é abandonada
+    (o resultado descartado) e a tarefa seguinte corre numa thread nova
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.future = None
+
+    def submit(self, func, args, kwargs):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = self.executor.submit(func, *args, **kwargs)
+
+    def wait(self, timeout):
+        return bool(wait([self.future], timeout=timeout).done)
+
+    def result(self):
+        return self.future.result()
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self.future = None
+
+
+class Job:
+    """Tarefa submetida ao JobManager"""
+
+    FINAL_STATES = ('done', 'failed', 'cancelled', 'timeout')
+
+    def __init__(self, func, args, kwargs, kind, workspace_id, callback, key=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.key = key
+        self.workspace_id = workspace_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        # Espaços à espera do resultado (vários quando pedidos idênticos são coalescidos)
+        self.subscribers = {workspace_id: callback}
+        self.status = 'queued'
+        self.progress = 0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self.created_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.submitted = datetime.now().isoformat()
+        self.done_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in self.FINAL_STATES
+
+    def to_record(self):
+        """
+        Resumo partilhado com os outros processos do servidor: inclui os espaços
+        que acompanham a tarefa e o ficheiro produzido (tarefas de exportação)
+        """
+        return dict(self.to_dict(), subscribers=list(self.subscribers),
+                    output=self.result if isinstance(self.result, str) else None)
+
+    def to_dict(self):
+        """Resumo serializável (sem o resultado)"""
+        now = time.monotonic()
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'shared': len(self.subscribers) > 1,
+            'progress': self.progress,
+            'message': self.message,
+            'submitted': self.submitted,
+            'error': self.error,
+            'wait_ms': round(((self.started_at or now) - self.created_at) * 1000, 1),
+            'run_ms': round(((self.finished_at or now) - self.started_at) * 1000, 1) if self.started_at else None
+        }
+
+
+class JobManager:
+    """
+    Fila limitada + pool fixo de workers
+
+    Cada thread de despacho tem um worker próprio e só lhe entrega uma
+    tarefa de cada vez; como cancelamentos e tempos limite terminam o
+    processo, nunca há mais trabalho em execução do que workers. O excesso
+    espera na fila e, com a fila cheia, submit() lança QueueFull.
+    """
+
+    def __init__(self, workers=2, max_queue=16, timeout=300, use_processes=True, history=500):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.history = history
+        self.logger = logging.getLogger('SmartTour')
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.use_processes = use_processes
+        self.runners = None
+        self.progress_channel = None
+
+        # Ganchos do modo multi-processo (ver ResultsStore): on_change(job) a cada
+        # mudança de estado; cancel_source(job_id) -> espaço que pediu o cancelamento
+        self.on_change = None
+        self.cancel_source = None
+
+        self.inflight = {}  # chave (versão do dataset, operação) -> tarefa por terminar
+        self.counters = {'submitted': 0, 'coalesced': 0, 'rejected': 0, 'done': 0, 'failed': 0, 'cancelled': 0, 'timeout': 0}
+        self.wait_times = deque(maxlen=200)
+        self.run_times = deque(maxlen=200)
+        self.running = 0
+
+        self.threads = []
+
+    def submit(self, func, *args, kind='analysis', workspace_id=None, callback=None,
+               progress=False, key=None, **kwargs):
+        """
+        Coloca uma tarefa na fila; func e argumentos têm de ser serializáveis (pickle)
+        Com progress=True, func recebe progress=ProgressReporter e cada evento
+        atualiza job.progress/job.message e chama o callback
+        Com key, um pedido igual a uma tarefa ainda por terminar junta-se a ela
+        (o callback passa a receber os eventos dessa tarefa) em vez de repetir o trabalho
+        """
+        self._start()
+        job = Job(func, args, kwargs, kind, workspace_id, callback, key)
+        if progress:
+            job.kwargs['progress'] = ProgressReporter(self._progress_channel(), job.id)
+        with self.lock:
+            shared = self.inflight.get(key) if key is not None else None
+            if shared is not None and not shared.finished and not shared.cancel_requested:
+                shared.subscribers[workspace_id] = callback
+                self.counters['coalesced'] += 1
+                job = shared
+            else:
+                if self.queue.full():
+                    self.counters['rejected'] += 1
+                    raise QueueFull(f'Fila de tarefas cheia ({self.max_queue})')
+                self.counters['submitted'] += 1
+                self.jobs[job.id] = job
+                if key is not None:
+                    self.inflight[key] = job
+                while len(self.jobs) > self.history:
+                    oldest_id, oldest = next(iter(self.jobs.items()))
+                    if not oldest.finished:
+                        break
+                    del self.jobs[oldest_id]
+                # Dentro do lock: só as threads de despacho retiram da fila, logo há espaço
+                self.queue.put_nowait(job)
+
+        self._changed(job)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id, workspace_id=None):
+        """
+        Cancela uma tarefa. Tarefas na fila nunca chegam a correr; uma tarefa
+        em execução é interrompida (o processo worker é terminado e recriado).
+        Numa tarefa partilhada, o espaço indicado apenas deixa de a acompanhar.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        with self.lock:
+            unsubscribe = workspace_id is not None and len(job.subscribers) > 1
+            if unsubscribe:
+                job.subscribers.pop(workspace_id, None)
+            else:
+                job.cancel_requested = True
+            queued = job.status == 'queued'
+        if unsubscribe:
+            self._changed(job)
+            return True
+        if queued:
+            self._finish(job, 'cancelled')
+        return True
+
+    def metrics(self):
+        """Profundidade da fila, ocupação e latências recentes"""
+        def percentiles(values):
+            if not values:
+                return {'p50': None, 'p95': None}
+            p50, p95 = np.percentile(list(values), [50, 95])
+            return {'p50': round(float(p50), 1), 'p95': round(float(p95), 1)}
+
+        with self.lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'max_queue': self.max_queue,
+                'workers': self.workers,
+                'running': self.running,
+                'timeout_s': self.timeout,
+                **self.counters,
+                'wait_ms': percentiles(self.wait_times),
+                'run_ms': percentiles(self.run_times)
+            }
+
+    def shutdown(self):
+        for runner in self.runners or ():
+            runner.stop()
+        if self.progress_channel is not None and self.use_processes:
+            self.progress_manager.shutdown()
+
+    def _start(self):
+        """
+        Cria os workers e as threads de despacho no primeiro submit, para que o
+        gestor possa ser importado antes de um fork (servidor pré-fork)
+        """
+        with self.lock:
+            if self.runners is not None:
+                return
+            worker = WorkerProcess if self.use_processes else WorkerThread
+            self.runners = [worker() for _ in range(self.workers)]
+            self.threads = [threading.Thread(target=self._dispatch, args=(runner,), daemon=True)
+                            for runner in self.runners]
+            for thread in self.threads:
+                thread.start()
+
+    def _progress_channel(self):
+        """Canal de eventos de progresso (criado no primeiro uso)"""
+        with self.lock:
+            if self.progress_channel is None:
+                # Entre processos é preciso uma fila gerida (proxy serializável)
+                if self.use_processes:
+                    self.progress_manager = multiprocessing.Manager()
+                    self.progress_channel = self.progress_manager.Queue()
+                else:
+                    self.progress_channel = queue.Queue()
+                threading.Thread(target=self._listen_progress, daemon=True).start()
+            return self.progress_channel
+
+    def _listen_progress(self):
+        """Aplica os eventos de progresso às tarefas em execução"""
+        while True:
+            try:
+                job_id, percent, message = self.progress_channel.get()
+            except (EOFError, OSError):
+                return
+            job = self.jobs.get(job_id)
+            if job is None or job.status != 'running':
+                continue
+            job.progress = percent
+            job.message = message
+            self._notify(job)
+
+    def _changed(self, job):
+        """Partilha o novo estado da tarefa (gancho on_change)"""
+        if self.on_change is None:
+            return
+        try:
+            self.on_change(job)
+        except Exception as e:
+            self.logger.error(f"Erro ao partilhar o estado da tarefa {job.id}: {e}")
+
+    def _remote_cancel(self, job):
+        """Aplica um cancelamento pedido noutro processo (gancho cancel_source)"""
+        if self.cancel_source is None:
+            return
+        workspace_id = self.cancel_source(job.id)
+        if workspace_id is not None:
+            self.cancel(job.id, workspace_id)
+
+    def _notify(self, job):
+        self._changed(job)
+        for callback in list(job.subscribers.values()):
+            if callback is None:
+                continue
+            try:
+                callback(job)
+            except Exception as e:
+                self.logger.error(f"Erro no callback da tarefa {job.id}: {e}")
+
+    def _finish(self, job, status, result=None, error=None):
+        with self.lock:
+            if job.finished:
+                return
+            if self.inflight.get(job.key) is job:
+                del self.inflight[job.key]
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.monotonic()
+            if status == 'done':
+                job.progress = 100
+            self.counters[status] += 1
+            if job.started_at is not None:
+                self.run_times.append((job.finished_at - job.started_at) * 1000)
+        # Liberta referências aos dados de entrada
+        job.args, job.kwargs = (), {}
+        self._notify(job)
+        job.done_event.set()
+
+    def _dispatch(self, runner):
+        """Thread de despacho: retira tarefas da fila e executa-as no seu worker"""
+        while True:
+            job = self.queue.get()
+            try:
+                self._run(job, runner)
+            finally:
+                self.queue.task_done()
+
+    def _run(self, job, runner):
+        self._remote_cancel(job)
+        with self.lock:
+            # Cancelada enquanto estava na fila
+            if job.finished or job.cancel_requested:
+                return
+            job.status = 'running'
+            job.started_at = time.monotonic()
+            self.wait_times.append((job.started_at - job.created_at) * 1000)
+            self.running += 1
+        self._notify(job)
+
+        try:
+            # O worker está livre: a tarefa começa já e o tempo limite conta daqui
+            runner.submit(job.func, job.args, job.kwargs)
+            deadline = job.started_at + self.timeout
+
+            # Espera em fatias curtas para reagir a cancelamentos
+            while not runner.wait(0.25):
+                self._remote_cancel(job)
+                if job.cancel_requested:
+                    runner.stop()
+                    self._finish(job, 'cancelled')
+                    return
+                if time.monotonic() > deadline:
+                    runner.stop()
+                    self._finish(job, 'timeout', error=f'Tempo limite excedido ({self.timeout}s)')
+                    self.logger.warning(f"Tarefa {job.id} excedeu o tempo limite")
+                    return
+
+            result = runner.result()
+            if job.cancel_requested:
+                self._finish(job, 'cancelled')
+                return
+            self._finish(job, 'done', result=result)
+
+        except Exception as e:
+            self.logger.error(f"Erro na tarefa {job.id}: {e}")
+            self._finish(job, 'failed', error=str(e))
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class Flight:
+    """Cálculo em curso partilhado por vários pedidos"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise TimeoutError('Tempo limite à espera do cálculo partilhado')
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Coalescência de pedidos idênticos dentro do processo: o primeiro pedido
+    com uma chave (versão do dataset, operação) calcula, os restantes esperam
+    e recebem o mesmo resultado
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.coalesced = 0
+
+    def join(self, key):
+        """Retorna (flight, líder); o líder tem de chamar finish() no fim"""
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self.flights[key] = Flight()
+            return flight, True
+
+    def finish(self, key, result=None, error=None):
+        with self.lock:
+            flight = self.flights.pop(key, None)
+        if flight is not None:
+            flight.result = result
+            flight.error = error
+            flight.done.set()
+
+    def do(self, key, func, *args, **kwargs):
+        """Executa func uma única vez por chave em simultâneo"""
+        flight, leader = self.join(key)
+        if not leader:
+            return flight.wait()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+
+class RateLimiter:
+    """Limite de pedidos por cliente (token bucket)"""
+
+    def __init__(self, per_minute=12, burst=5, max_clients=10_000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets = {}  # cliente -> (fichas, instante)
+        self.lock = threading.Lock()
+
+    def allow(self, client):
+        """Retorna (permitido, segundos até haver nova ficha)"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self.buckets[client] = (tokens - 1, now)
+                allowed, retry_after = True, 0
+            else:
+                self.buckets[client] = (tokens, now)
+                allowed, retry_after = False, round((1 - tokens) / self.rate, 1)
+            if len(self.buckets) > self.max_clients:
+                self._prune(now)
+            return allowed, retry_after
+
+    def _prune(self, now):
+        """Esquece clientes cujo balde já voltou a encher"""
+        full_after = self.burst / self.rate
+        self.buckets = {c: b for c, b in self.buckets.items() if now - b[1] < full_after}
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Modelo de KPIs
+Estrutura única dos indicadores, lida pela API, pelos templates
+e pela aplicação desktop, com serialização JSON rápida
+"""
+
+import json
+from dataclasses import dataclass, asdict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Sem orjson usa-se o módulo json da biblioteca padrão
+
+
+@dataclass(slots=True, frozen=True)
+class TourismKPIs:
+    total_annual_visitors: int
+    provinces_count: int
+    foreign_visitor_percentage: float
+    average_stay_duration: float
+    seasonal_variation: float
+
+
+@dataclass(slots=True, frozen=True)
+class SustainabilityKPIs:
+    total_sites: int
+    total_eco_capacity: int
+    sustainable_sites_percentage: float
+    average_sustainability_score: float
+    provinces_with_eco_sites: int
+
+
+@dataclass(slots=True, frozen=True)
+class EconomicKPIs:
+    estimated_annual_revenue: int
+    average_site_fee: float
+
+
+@dataclass(slots=True, frozen=True)
+class KPIs:
+    """KPIs de uma análise (imutáveis; acesso por atributo nos templates)"""
+    tourism_kpis: TourismKPIs
+    sustainability_kpis: SustainabilityKPIs
+    economic_kpis: EconomicKPIs
+
+    def to_dict(self):
+        return asdict(self)
+
+    def to_json(self):
+        """JSON compacto em bytes (UTF-8)"""
+        if orjson is not None:
+            return orjson.dumps(self)
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Consultas Nomeadas
+Consultas sobre uma vista dos dados/resultados (snapshot do núcleo),
+usadas pelas rotas individuais e pela API em lote: todas as consultas
+de um lote leem a mesma vista, logo veem a mesma versão dos resultados
+"""
+
+import inspect
+import logging
+
+MAX_BATCH_QUERIES = 50
+
+logger = logging.getLogger('SmartTour')
+
+
+class QueryError(Exception):
+    """Consulta inválida ou sem dados (mensagem devolvida ao cliente)"""
+
+
+def require_data(view):
+    if not view.data_loaded:
+        raise QueryError('Dados não carregados')
+
+
+def require_analysis(view):
+    if not view.analysis_completed:
+        raise QueryError('Análise não concluída')
+
+
+def query_kpis(view):
+    require_analysis(view)
+    return view.kpis.to_dict()
+
+
+def query_provinces(view):
+    require_data(view)
+    provinces = dict.fromkeys(view.province_index['visitors'])
+    provinces.update(dict.fromkeys(view.province_index['sites']))
+    return {'provinces': list(provinces)}
+
+
+def query_province(view, name):
+    """Série temporal e sítios de uma província"""
+    require_data(view)
+    visitor_rows = view.province_index['visitors'].get(name)
+    site_rows = view.province_index['sites'].get(name)
+    if visitor_rows is None and site_rows is None:
+        raise QueryError(f'Província não encontrada: {name}')
+
+    visitors = view.visitors_df.iloc[visitor_rows if visitor_rows is not None else []]
+    sites = view.sites_df.iloc[site_rows if site_rows is not None else []]
+
+    time_series = visitors[['date', 'visitors_total', 'foreign_share', 'avg_stay_nights', 'season']].copy()
+    time_series['date'] = time_series['date'].dt.strftime('%Y-%m-%d')
+
+    return {
+        'province': name,
+        'time_series': time_series.to_dict(orient='records'),
+        'sites': sites[['site_name', 'lat', 'lon', 'fragility_index', 'capacity_daily', 'fee_aoa']].to_dict(orient='records')
+    }
+
+
+def query_trends(view, province=None):
+    """Visitantes por mês (todas as províncias ou apenas uma)"""
+    require_data(view)
+    df = view.visitors_df
+    if province is not None:
+        rows = view.province_index['visitors'].get(province)
+        if rows is None:
+            raise QueryError(f'Província não encontrada: {province}')
+        df = df.iloc[rows]
+
+    monthly = df.groupby('date', sort=True)['visitors_total'].sum()
+    return {
+        'province': province,
+        'dates': monthly.index.strftime('%Y-%m-%d').tolist(),
+        'visitors': [int(v) for v in monthly.to_numpy()]
+    }
+
+
+def query_sites(view):
+    """Procura atribuída, receita e pressão por sítio"""
+    require_analysis(view)
+    return view.site_stats.get('by_site', {})
+
+
+def query_visitor_stats(view):
+    require_analysis(view)
+    return view.visitor_stats
+
+
+QUERIES = {
+    'kpis': query_kpis,
+    'provinces': query_provinces,
+    'province': query_province,
+    'trends': query_trends,
+    'sites': query_sites,
+    'visitor_stats': query_visitor_stats
+}
+
+
+def run_batch(view, queries, handlers=QUERIES):
+    """
+    Avalia uma lista de consultas [{"name": ..., "args": {...}, "id": ...}]
+    sobre a mesma vista; erros de uma consulta (incluindo erros inesperados
+    do handler) ficam no resultado dessa consulta e não interrompem as restantes
+    """
+    if not isinstance(queries, list) or not queries:
+        raise QueryError('Indique uma lista de consultas em "queries"')
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise QueryError(f'Máximo de {MAX_BATCH_QUERIES} consultas por pedido')
+
+    results = {}
+    for i, spec in enumerate(queries):
+        if not isinstance(spec, dict) or spec.get('name') not in handlers:
+            results[str(i)] = {'error': f"Consulta desconhecida: {spec.get('name') if isinstance(spec, dict) else spec}",
+                               'available': list(handlers)}
+            continue
+
+        query_id = str(spec.get('id', spec['name']))
+        if query_id in results:
+            query_id = f'{query_id}_{i}'
+
+        handler = handlers[spec['name']]
+        args = spec.get('args') or {}
+        # Todos os argumentos das consultas são nomes (texto)
+        valid = isinstance(args, dict) and all(isinstance(value, str) for value in args.values())
+        try:
+            if valid:
+                inspect.signature(handler).bind(view, **args)
+        except TypeError:
+            valid = False
+        if not valid:
+            results[query_id] = {'error': f"Argumentos inválidos para {spec['name']}"}
+            continue
+
+        try:
+            results[query_id] = {'data': handler(view, **args)}
+        except QueryError as e:
+            results[query_id] = {'error': str(e)}
+        except Exception as e:
+            logger.error(f"Erro na consulta {spec['name']}: {e}")
+            results[query_id] = {'error': f"Erro interno na consulta {spec['name']}"}
+
+    return results
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Relatórios HTML
+Templates Jinja compilados uma única vez (ao importar o módulo) e
+renderizados em streaming: o relatório sai em blocos à medida que as
+linhas das tabelas são geradas, com estilos em classes CSS partilhadas
+em vez de atributos style repetidos em cada célula.
+"""
+
+from jinja2 import DictLoader, Environment, select_autoescape
+from markupsafe import Markup
+
+# Número de fragmentos do template agrupados em cada bloco emitido
+STREAM_BUFFER = 64
+
+BASE_TEMPLATE = """<!DOCTYPE html>
+<html lang="pt">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>SmartTour Angola - Relatório</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }
+        h1, h2 { color: #333; }
+        .header { background: linear-gradient(135deg, #CE1126, #FFCD00); color: white;
+                  padding: 30px; text-align: center; border-radius: 10px; margin-bottom: 20px; }
+        .header h1, .header .report-title { color: white; }
+        .section { background: white; margin: 20px 0; padding: 25px; border-radius: 10px;
+                   box-shadow: 0 2px 5px rgba(0,0,0,0.1); }
+        .kpi-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+                    gap: 20px; margin: 20px 0; }
+        .kpi-card { background: #f8f9fa; padding: 20px; border-radius: 8px;
+                    text-align: center; border-left: 4px solid #CE1126; }
+        .kpi-value { font-size: 2em; font-weight: bold; color: #CE1126; }
+        .kpi-label { color: #666; margin-top: 10px; }
+        .data-table { width: 100%; border-collapse: collapse; }
+        .data-table th, .data-table td { padding: 10px; border: 1px solid #ddd; }
+        .data-table th { background: #f8f9fa; }
+        .data-table td.num { text-align: right; }
+        .footer { text-align: center; color: #666; margin-top: 40px; padding: 20px; }
+        .up { color: #28a745; }
+        .down { color: #CE1126; }
+        .status-added { background: #eafaf0; }
+        .status-removed { background: #fdecee; }
+        .diff-counts span { margin-right: 15px; padding: 2px 8px; border-radius: 4px; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>🇦🇴 SmartTour Angola</h1>
+        <p>Sistema de Análise de Turismo Sustentável</p>
+        {% if title %}<h2 class="report-title">{{ title }}</h2>{% endif %}
+        <p>Relatório gerado em: {{ generated }}</p>
+    </div>
+    {% block content %}{% endblock %}
+    <div class="footer">
+        {% block footer %}<p>SmartTour Angola - Sistema de Análise de Turismo Sustentável</p>{% endblock %}
+    </div>
+    {{ bundle }}
+</body>
+</html>
+"""
+
+KPI_CARDS = """
+        <div class="kpi-grid">
+            {% for label, value in kpi_cards %}
+            <div class="kpi-card">
+                <div class="kpi-value">{{ value }}</div>
+                <div class="kpi-label">{{ label }}</div>
+            </div>
+            {% endfor %}
+        </div>
+"""
+
+PROVINCE_TABLE = """
+        <table class="data-table">
+            <tr><th>Província</th><th>Visitantes</th><th>% Estrangeiros</th><th>{{ stay_label }}</th></tr>
+            {% for row in provinces %}
+            <tr><td>{{ row.province }}</td><td class="num">{{ row.visitors|thousands }}</td><td class="num">{{ row.foreign }}%</td><td class="num">{{ row.stay }}</td></tr>
+            {% endfor %}
+        </table>
+"""
+
+CORE_REPORT = """{% extends "base.html" %}
+{% block content %}
+    <div class="section">
+        <h2>📊 Resumo Executivo</h2>
+        {% include "kpi_cards.html" %}
+    </div>
+
+    <div class="section">
+        <h2>📈 Visualizações</h2>
+        {% for chart in charts %}{{ chart }}{% endfor %}
+    </div>
+
+    <div class="section">
+        <h2>🏆 Top Províncias por Visitantes</h2>
+        {% include "province_table.html" %}
+    </div>
+{% endblock %}
+{% block footer %}
+        <p>SmartTour Angola - Sistema de Análise de Turismo Sustentável</p>
+        <p>Desenvolvido para o FTL Bootcamp Hackathon</p>
+{% endblock %}
+"""
+
+INTEGRATED_REPORT = """{% extends "base.html" %}
+{% block content %}
+    <div class="section">
+        <h2>📊 Resumo Executivo</h2>
+        {% include "kpi_cards.html" %}
+
+        <h3>🎯 Principais Achados:</h3>
+        <ul>{% for finding in findings %}<li>{{ finding }}</li>{% endfor %}</ul>
+
+        <h3>💡 Recomendações:</h3>
+        <ul>{% for rec in recommendations %}<li>{{ rec }}</li>{% endfor %}</ul>
+    </div>
+
+    <div class="section">
+        <h2>📈 Visualizações</h2>
+        {% for chart in charts %}{{ chart }}{% endfor %}
+    </div>
+
+    <div class="section">
+        <h2>🏆 Top Províncias</h2>
+        {% include "province_table.html" %}
+    </div>
+{% endblock %}
+{% block footer %}<p>SmartTour Angola - Desenvolvido para FTL Bootcamp</p>{% endblock %}
+"""
+
+DIFF_REPORT = """{% extends "base.html" %}
+{% block content %}
+    <div class="section">
+        <h2>🔀 KPIs: {{ diff.base }} → {{ diff.target }}</h2>
+        <table class="data-table">
+            <tr><th>KPI</th><th>Base</th><th>Nova</th><th>Δ</th><th>Δ %</th></tr>
+            {% for name, (old, new, delta, pct) in diff.summary.items() %}
+            <tr><td>{{ labels.get(name, name) }}</td><td class="num">{{ old|number }}</td><td class="num">{{ new|number }}</td><td class="num {{ delta|trend }}">{{ delta|signed }}</td><td class="num {{ delta|trend }}">{{ pct|signed }}{% if pct is not none %}%{% endif %}</td></tr>
+            {% endfor %}
+        </table>
+    </div>
+    {% for title, section, metrics in tables %}
+
+    <div class="section">
+        <h2>{{ title }}</h2>
+        <p class="diff-counts">{% for status, n in section.counts.items() %}<span class="status-{{ status }}">{{ status_labels[status] }}: {{ n }}</span>{% endfor %}</p>
+        {% if section.rows %}
+        <table class="data-table">
+            <tr><th></th><th>Estado</th>{% for metric in metrics %}<th>{{ labels.get(metric, metric) }}</th>{% endfor %}</tr>
+            {% for row in section.rows %}
+            <tr class="status-{{ row.status }}"><td>{{ row.key }}</td><td>{{ status_labels[row.status] }}</td>{% for metric in metrics %}<td class="num">{{ row.changes.get(metric)|change }}</td>{% endfor %}</tr>
+            {% endfor %}
+        </table>
+        {% else %}
+        <p>Sem alterações.</p>
+        {% endif %}
+    </div>
+    {% endfor %}
+{% endblock %}
+"""
+
+
+def format_number(value):
+    if value is None:
+        return '—'
+    return f'{value:,.0f}' if float(value).is_integer() else f'{value:,.2f}'.rstrip('0').rstrip('.')
+
+
+def format_signed(value):
+    if value is None:
+        return '—'
+    return ('+' if value > 0 else '') + format_number(value)
+
+
+def format_trend(value):
+    return '' if not value else 'up' if value > 0 else 'down'
+
+
+def format_change(change):
+    """Célula [antigo, novo, delta, %]: 'novo (+delta)' ou só o valor que existe"""
+    if not change:
+        return ''
+    old, new, delta, _ = change
+    if old is None or new is None:
+        return format_number(new if old is None else old)
+    return Markup('{} <span class="{}">({})</span>').format(format_number(new), format_trend(delta), format_signed(delta))
+
+
+env = Environment(
+    loader=DictLoader({
+        'base.html': BASE_TEMPLATE,
+        'kpi_cards.html': KPI_CARDS,
+        'province_table.html': PROVINCE_TABLE,
+        'core_report.html': CORE_REPORT,
+        'integrated_report.html': INTEGRATED_REPORT,
+        'diff_report.html': DIFF_REPORT
+    }),
+    autoescape=select_autoescape(default=True),
+    trim_blocks=True,
+    lstrip_blocks=True
+)
+env.filters['thousands'] = lambda value: f'{value:,}'
+env.filters['number'] = format_number
+env.filters['signed'] = format_signed
+env.filters['trend'] = format_trend
+env.filters['change'] = format_change
+
+# Compilados ao importar; cada relatório só executa o código já gerado
+TEMPLATES = {name: env.get_template(f'{name}_report.html') for name in ('core', 'integrated', 'diff')}
+
+
+def render_report(name, **context):
+    """
+    Gera o relatório 'core', 'integrated' ou 'diff' em blocos de texto; HTML já
+    pronto (gráficos, bundle offline) deve vir em Markup para não ser escapado
+    """
+    stream = TEMPLATES[name].stream(**context)
+    stream.enable_buffering(STREAM_BUFFER)
+    yield from stream
+
+
+def trusted(html):
+    """Marca HTML gerado pelo próprio sistema como seguro"""
+    return Markup(html)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Servidor de Produção
+Servidor pré-fork: o processo principal abre o socket, pré-carrega os
+últimos resultados do armazém partilhado e cria N workers que herdam
+o socket (e a memória já carregada). Workers que morrem são recriados.
+
+Uso: python smarttour_server.py [--workers 4] [--port 5000] [--store results_store]
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+
+from werkzeug.serving import make_server
+
+import smarttour_web
+
+logger = logging.getLogger('SmartTour')
+
+
+def open_socket(host, port, backlog=128):
+    """Socket de escuta partilhado por todos os workers"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock, host, port):
+    """Corpo de cada worker: serve pedidos a partir do socket herdado"""
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C é tratado pelo processo principal
+    server = make_server(host, port, smarttour_web.app, threaded=True, fd=sock.fileno())
+    logger.info(f"Worker {os.getpid()} pronto")
+    try:
+        server.serve_forever()
+    finally:
+        # Os processos do pool de análises herdam o socket; têm de sair com o worker
+        smarttour_web.jobs.shutdown()
+
+
+def spawn(sock, host, port):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(sock, host, port)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def serve(host='0.0.0.0', port=5000, workers=4, store_root='results_store'):
+    """Arranca o servidor pré-fork e supervisiona os workers"""
+    loaded = smarttour_web.enable_store(store_root)
+
+    if not hasattr(os, 'fork'):
+        # Windows: sem fork, um único processo com o armazém ativo
+        logger.warning("fork indisponível; a servir num único processo")
+        smarttour_web.app.run(host=host, port=port, threaded=True)
+        return
+
+    # Cada worker tem o seu pool de análises: repartir os núcleos entre eles
+    smarttour_web.app.config['JOB_WORKERS'] = max(1, (os.cpu_count() or 1) // workers)
+    smarttour_web.jobs.workers = smarttour_web.app.config['JOB_WORKERS']
+
+    sock = open_socket(host, port)
+    children = {spawn(sock, host, port) for _ in range(workers)}
+    print(f"🚀 {workers} workers em http://{host}:{port} ({loaded} espaço(s) pré-carregados)", flush=True)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            logger.warning(f"Worker {pid} terminou (estado {status}); a recriar")
+            children.add(spawn(sock, host, port))
+
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SmartTour Angola - servidor de produção')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--store', default='results_store', help='Diretório do armazém partilhado')
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, args.store)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Simulação Monte Carlo de Receitas
+Amostra ocupação, elasticidade da taxa e procura sazonal por sítio
+e distribui os sorteios por um pool de processos
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Ocupação base usada na estimativa pontual de calculate_kpis
+BASE_OCCUPANCY = 0.6
+
+# Elasticidade-preço da procura (não há variação de taxas nos dados,
+# por isso usa-se uma distribuição a priori: Normal(média, desvio))
+FEE_ELASTICITY_PRIOR = (-0.4, 0.15)
+
+# Número de sorteios processados de cada vez (limita memória por worker)
+CHUNK_SIZE = 100_000
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def fit_site_distributions(visitors_df, sites_df, base_occupancy=BASE_OCCUPANCY):
+    """
+    Ajusta os parâmetros das distribuições por sítio a partir de visitors_df
+
+    - Ocupação: Beta com média base_occupancy e variância dada pelo
+      coeficiente de variação dos visitantes da província
+    - Sazonalidade: Lognormal do rácio visitantes/média da província
+    Províncias sem histórico suficiente usam os parâmetros globais.
+    """
+    visitors = visitors_df[['province', 'visitors_total']].copy()
+    province_mean = visitors.groupby('province')['visitors_total'].transform('mean')
+    visitors['log_ratio'] = np.log(visitors['visitors_total'] / province_mean)
+
+    grouped = visitors.groupby('province')
+    cv = grouped['visitors_total'].std() / grouped['visitors_total'].mean()
+    season_sigma = grouped['log_ratio'].std()
+
+    global_cv = visitors['visitors_total'].std() / visitors['visitors_total'].mean()
+    global_sigma = np.log(visitors['visitors_total'] / visitors['visitors_total'].mean()).std()
+    global_cv = 0.0 if pd.isna(global_cv) else global_cv
+    global_sigma = 0.0 if pd.isna(global_sigma) else global_sigma
+
+    site_cv = sites_df['province'].map(cv).fillna(global_cv).to_numpy(dtype=float)
+    sigma = sites_df['province'].map(season_sigma).fillna(global_sigma).to_numpy(dtype=float)
+
+    # Beta pelo método dos momentos (variância limitada ao máximo admissível)
+    mean = base_occupancy
+    var = np.clip((site_cv * mean) ** 2, 1e-6, mean * (1 - mean) * 0.99)
+    k = mean * (1 - mean) / var - 1
+
+    fees = sites_df['fee_aoa'].to_numpy(dtype=float)
+    province_fee = sites_df.groupby('province')['fee_aoa'].transform('mean').to_numpy(dtype=float)
+
+    return {
+        'capacity': sites_df['capacity_daily'].to_numpy(dtype=float),
+        'fee': fees,
+        'relative_fee': fees / province_fee,
+        'occupancy_alpha': mean * k,
+        'occupancy_beta': (1 - mean) * k,
+        # mu = -sigma²/2 para que o fator sazonal tenha média 1
+        'season_mu': -0.5 * sigma ** 2,
+        'season_sigma': sigma,
+        'elasticity_mean': FEE_ELASTICITY_PRIOR[0],
+        'elasticity_sd': FEE_ELASTICITY_PRIOR[1]
+    }
+
+
+def _simulate_chunk(params, n_draws, seed):
+    """Executa n_draws sorteios vetorizados (corre num processo do pool)"""
+    rng = np.random.default_rng(seed)
+    n_sites = len(params['capacity'])
+    annual_capacity_value = params['capacity'] * params['fee'] * 365
+    revenues = np.empty(n_draws)
+
+    for start in range(0, n_draws, CHUNK_SIZE):
+        size = (min(CHUNK_SIZE, n_draws - start), n_sites)
+        occupancy = rng.beta(params['occupancy_alpha'], params['occupancy_beta'], size=size)
+        season = rng.lognormal(params['season_mu'], params['season_sigma'], size=size)
+        elasticity = rng.normal(params['elasticity_mean'], params['elasticity_sd'], size=(size[0], 1))
+
+        # Sítios mais caros que a média da província atraem menos procura
+        demand = occupancy * season * params['relative_fee'] ** elasticity
+        np.clip(demand, 0.0, 1.0, out=demand)
+        revenues[start:start + size[0]] = demand @ annual_capacity_value
+
+    return revenues
+
+
+def simulate_revenue(visitors_df, sites_df, n_draws=1_000_000, workers=None,
+                     seed=None, percentiles=DEFAULT_PERCENTILES):
+    """
+    Simula a receita anual por Monte Carlo
+
+    Os sorteios são divididos em partes iguais pelos workers, cada um com
+    uma semente independente (SeedSequence.spawn), pelo que o resultado é
+    reprodutível para a mesma semente e número de workers.
+    """
+    params = fit_site_distributions(visitors_df, sites_df)
+    workers = max(1, min(workers or os.cpu_count() or 1, n_draws))
+
+    sizes = [n_draws // workers + (1 if i < n_draws % workers else 0) for i in range(workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+
+    if workers == 1:
+        revenues = _simulate_chunk(params, sizes[0], seeds[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = executor.map(_simulate_chunk, [params] * workers, sizes, seeds)
+            revenues = np.concatenate(list(parts))
+
+    values = np.percentile(revenues, percentiles)
+    return {
+        'n_draws': n_draws,
+        'workers': workers,
+        'mean': int(revenues.mean()),
+        'std': int(revenues.std()),
+        'percentiles': {f'p{p}': int(v) for p, v in zip(percentiles, values)}
+    }
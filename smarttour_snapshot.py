@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Snapshot de Resultados
+Estado publicado do núcleo (dados + resultados da análise) num objeto
+imutável. Uma nova análise constrói um snapshot novo à parte e publica-o
+trocando uma única referência, por isso quem lê (sem locks) vê sempre
+uma versão completa e coerente, nunca uma mistura de valores antigos e novos.
+"""
+
+from dataclasses import dataclass, field, replace
+
+
+@dataclass(slots=True, frozen=True)
+class AnalysisSnapshot:
+    """
+    Dados e resultados de uma versão do dataset
+    Os dicts e DataFrames contidos são partilhados e não devem ser alterados
+    """
+    dataset_version: str = None
+    visitors_df: object = None
+    sites_df: object = None
+    province_index: dict = field(default_factory=lambda: {'visitors': {}, 'sites': {}})
+    data_bytes: int = 0  # Memória dos DataFrames (calculada uma vez ao publicar os dados)
+
+    # Resultados (None até a análise desta versão ser publicada)
+    analysis_run: str = None
+    visitor_stats: dict = field(default_factory=dict)
+    site_stats: dict = field(default_factory=dict)
+    kpis: object = None
+    kpis_json: bytes = None
+
+    @property
+    def data_loaded(self):
+        return self.visitors_df is not None
+
+    @property
+    def analysis_completed(self):
+        return self.kpis is not None
+
+    def with_results(self, analysis_run, visitor_stats, site_stats, kpis):
+        """Novo snapshot com os mesmos dados e os resultados dados"""
+        return replace(self, analysis_run=analysis_run, visitor_stats=visitor_stats,
+                       site_stats=site_stats, kpis=kpis, kpis_json=kpis.to_json())
+
+
+EMPTY_SNAPSHOT = AnalysisSnapshot()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Armazém Partilhado de Resultados
+Dados e resultados de cada espaço de trabalho num ficheiro em disco,
+partilhado por todos os processos do servidor. Cada publicação escreve
+um ficheiro temporário e troca-o com os.replace, por isso um processo
+vê sempre a versão anterior completa ou a nova completa, nunca metade.
+
+O estado de cada espaço (análise em curso, progresso) e o resumo de cada
+tarefa também ficam aqui, em JSON, para que qualquer worker responda a
+/api/status, /api/jobs/<id> ou descarregue uma exportação, seja qual for
+o processo que recebeu o pedido original.
+"""
+
+import json
+import logging
+import os
+import pickle
+import re
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+class ResultsStore:
+    """Um snapshot (pickle) por espaço de trabalho"""
+
+    SUFFIX = '.pkl'
+    STATUS_SUFFIX = '.status.json'
+    JOB_ID_PATTERN = re.compile(r'[0-9a-f]{12}')
+
+    def __init__(self, root='results_store', max_entries=64, max_jobs=500):
+        self.root = Path(root)
+        self.jobs_root = self.root / 'jobs'
+        self.max_entries = max_entries
+        self.max_jobs = max_jobs
+        self.logger = logging.getLogger('SmartTour')
+        self.lock = threading.Lock()
+        self.jobs_lock = threading.Lock()  # Eventos da mesma tarefa escritos por ordem
+        self.jobs_root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, workspace_id):
+        return self.root / f'{workspace_id}{self.SUFFIX}'
+
+    def status_path(self, workspace_id):
+        return self.root / f'{workspace_id}{self.STATUS_SUFFIX}'
+
+    def job_path(self, job_id, suffix='.json'):
+        if not self.JOB_ID_PATTERN.fullmatch(job_id):
+            raise ValueError(f'Identificador de tarefa inválido: {job_id}')
+        return self.jobs_root / f'{job_id}{suffix}'
+
+    def write_json(self, path, payload):
+        """Escrita atómica (ficheiro temporário + os.replace); devolve o stamp"""
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            return self.stamp(os.stat(path))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def read_json(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def stamp(stat):
+        """Identifica uma publicação: cada os.replace traz um novo inode"""
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def publish(self, workspace):
+        """Grava dados e resultados do espaço e torna-os visíveis de uma só vez"""
+        smarttour = workspace.smarttour
+        data = smarttour.snapshot()
+        if not data.data_loaded:
+            return False
+
+        snapshot = {
+            'workspace_id': workspace.id,
+            'published': datetime.now().isoformat(),
+            'visitors_df': data.visitors_df,
+            'sites_df': data.sites_df,
+            'results': smarttour.analysis_results() if data.analysis_completed else None
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-', suffix=self.SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path(workspace.id))
+            workspace.store_stamp = self.stamp(os.stat(self.path(workspace.id)))
+        except Exception as e:
+            self.logger.error(f"Erro ao publicar resultados de {workspace.id}: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
+
+        self.prune()
+        return True
+
+    def save_status(self, workspace):
+        """Partilha o estado do espaço (Workspace.status_listener, chamado com o lock do espaço)"""
+        try:
+            workspace.status_stamp = self.write_json(self.status_path(workspace.id), workspace.status)
+        except Exception as e:
+            self.logger.error(f"Erro ao partilhar o estado de {workspace.id}: {e}")
+
+    def sync_status(self, workspace):
+        """Aplica o estado escrito por outro processo, se mudou desde o último visto"""
+        path = self.status_path(workspace.id)
+        try:
+            stamp = self.stamp(os.stat(path))
+        except FileNotFoundError:
+            return False
+        if stamp == workspace.status_stamp:
+            return False
+        status = self.read_json(path)
+        if status is None:
+            return False
+        workspace.status_stamp = stamp
+        workspace.apply_status(status)
+        return True
+
+    def save_job(self, job):
+        """Partilha o resumo da tarefa (JobManager.on_change)"""
+        with self.jobs_lock:
+            # Resumo lido já dentro do lock: a última escrita tem sempre o estado mais recente
+            self.write_json(self.job_path(job.id), job.to_record())
+        if job.finished:
+            self.prune_jobs()
+
+    def load_job(self, job_id):
+        """Resumo de uma tarefa de qualquer processo (dict) ou None"""
+        try:
+            return self.read_json(self.job_path(job_id))
+        except ValueError:
+            return None
+
+    def workspace_jobs(self, workspace_id):
+        """Resumos das tarefas que o espaço acompanha, das mais antigas às mais recentes"""
+        records = [self.read_json(path) for path in self.job_files()]
+        return [r for r in reversed(records) if r is not None and workspace_id in r['subscribers']]
+
+    def request_cancel(self, job_id, workspace_id):
+        """Pede o cancelamento ao processo que executa a tarefa"""
+        self.write_json(self.job_path(job_id, '.cancel'), {'workspace_id': workspace_id})
+
+    def cancel_request(self, job_id):
+        """Espaço que pediu o cancelamento da tarefa (JobManager.cancel_source) ou None"""
+        path = self.job_path(job_id, '.cancel')
+        request = self.read_json(path)
+        if request is None:
+            return None
+        path.unlink(missing_ok=True)
+        return request['workspace_id']
+
+    def job_files(self):
+        """Resumos de tarefas, do mais recente para o mais antigo"""
+        entries = []
+        for path in self.jobs_root.glob('*.json'):
+            if path.name.startswith('.'):
+                continue
+            try:
+                entries.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                continue
+        return [path for _, path in sorted(entries, reverse=True)]
+
+    def sync(self, workspace):
+        """
+        Aplica o estado e o snapshot publicados (por qualquer processo) se forem
+        mais recentes que os já carregados; com uma análise em curso (aqui ou
+        noutro processo) os dados não são tocados
+        """
+        self.sync_status(workspace)
+        if workspace.busy:
+            return False
+
+        with self.lock:
+            try:
+                with open(self.path(workspace.id), 'rb') as f:
+                    stamp = self.stamp(os.fstat(f.fileno()))
+                    if stamp == workspace.store_stamp:
+                        return False
+                    snapshot = pickle.load(f)
+            except FileNotFoundError:
+                return False
+            except Exception as e:
+                self.logger.error(f"Erro ao ler resultados de {workspace.id}: {e}")
+                return False
+
+            smarttour = workspace.smarttour
+            smarttour.set_data(snapshot['visitors_df'], snapshot['sites_df'])
+            results = snapshot['results']
+            completed = results is not None and smarttour.apply_analysis_results(results)
+            workspace.results_page = None
+            workspace.store_stamp = stamp
+            workspace.update_status(completed=completed, progress=100 if completed else 0,
+                                    message='Resultados disponíveis' if completed else 'Dados carregados')
+            return True
+
+    def workspace_ids(self):
+        """Espaços publicados, do mais recente para o mais antigo"""
+        entries = []
+        for path in self.root.glob(f'*{self.SUFFIX}'):
+            if path.name.startswith('.'):
+                continue  # Publicação em curso
+            try:
+                entries.append((path.stat().st_mtime_ns, path.stem))
+            except FileNotFoundError:
+                continue  # Removido entretanto por outro processo
+        return [workspace_id for _, workspace_id in sorted(entries, reverse=True)]
+
+    def preload(self, registry, limit=None):
+        """Carrega os últimos snapshots no registo (arranque a quente)"""
+        loaded = 0
+        for workspace_id in self.workspace_ids()[:limit or registry.max_workspaces]:
+            if self.sync(registry.get(workspace_id)):
+                loaded += 1
+        self.logger.info(f"{loaded} espaço(s) de trabalho pré-carregados de {self.root}")
+        return loaded
+
+    def prune(self):
+        """Mantém apenas os max_entries snapshots (e os max_jobs resumos de tarefas) mais recentes"""
+        for workspace_id in self.workspace_ids()[self.max_entries:]:
+            try:
+                self.path(workspace_id).unlink()
+                self.status_path(workspace_id).unlink(missing_ok=True)
+            except OSError:
+                pass
+        self.prune_jobs()
+
+    def prune_jobs(self):
+        for path in self.job_files()[self.max_jobs:]:
+            path.unlink(missing_ok=True)
+            path.with_suffix('.cancel').unlink(missing_ok=True)
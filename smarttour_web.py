@@ -4,58 +4,184 @@ SmartTour Angola - Web App
 Interface web moderna para análise de turismo sustentável
 """
 
-from flask import Flask, render_template, jsonify, request, redirect, url_for, send_file, flash
+from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, Response, abort, session, stream_with_context, send_file
 import os
+import re
+import gzip
 import json
+import time
 import threading
-from datetime import datetime
+from collections import OrderedDict
+from functools import wraps
 from werkzeug.utils import secure_filename
 import pandas as pd
 from pathlib import Path
 
-# Import do sistema SmartTour
-from smarttour_integrated import SmartTourAngola
+# Import do sistema SmartTour (núcleo unificado)
+from smarttour_workspaces import WorkspaceRegistry
+from smarttour_jobs import Job, JobManager, QueueFull, SingleFlight, RateLimiter
+from smarttour_store import ResultsStore
+import smarttour_export
+import smarttour_geo
+from smarttour_queries import QUERIES, QueryError, run_batch, query_provinces, query_province
+from smarttour_core import analyze_datasets, export_workbook
+from plotly.offline import get_plotlyjs_version
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # Sem brotli serve-se apenas gzip
 
 app = Flask(__name__)
 app.secret_key = 'smarttour_angola_2024_secretkey'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
+app.config['JOB_WORKERS'] = os.cpu_count() or 2  # Processos para análises (CPU)
+app.config['JOB_QUEUE_SIZE'] = 16                 # Tarefas em espera antes de recusar
+app.config['JOB_TIMEOUT'] = 300                   # Segundos por tarefa
+app.config['REPORT_CACHE_SIZE'] = 8               # Relatórios HTML guardados em memória
+app.config['RATE_LIMIT_PER_MINUTE'] = 12          # Pedidos pesados por cliente (análise/exportação)
+app.config['RATE_LIMIT_BURST'] = 5                # ... com rajadas até este valor
+app.config['EXPORT_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'exports')
+app.config['EXPORTS_KEPT'] = 8                    # Livros XLSX guardados (os mais recentes)
 
-# Criar diretório de uploads
+# Criar diretórios de uploads e de exportações
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
+
+# Fila limitada e pool fixo de processos para o trabalho pesado
+jobs = JobManager(workers=app.config['JOB_WORKERS'],
+                  max_queue=app.config['JOB_QUEUE_SIZE'],
+                  timeout=app.config['JOB_TIMEOUT'])
+
+# Pedidos idênticos em simultâneo partilham um único cálculo
+flights = SingleFlight()
+
+# Limite por cliente nas rotas que usam muito CPU
+rate_limiter = RateLimiter(per_minute=app.config['RATE_LIMIT_PER_MINUTE'],
+                           burst=app.config['RATE_LIMIT_BURST'])
+
+WORKSPACE_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+# Runtime carregado pela página de resultados só quando o primeiro gráfico fica visível
+PLOTLY_CDN_URL = f'https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js'
+
+# Espaços de trabalho por analista (dados, resultados e estado isolados)
+workspaces = WorkspaceRegistry(max_workspaces=32, max_memory_mb=512,
+                               upload_root=app.config['UPLOAD_FOLDER'])
 
-# Instância global do SmartTour
-smarttour = SmartTourAngola()
-analysis_status = {
-    'running': False,
-    'completed': False,
-    'progress': 0,
-    'message': 'Sistema pronto',
-    'last_update': datetime.now().isoformat()
-}
+# Relatórios HTML já gerados, por versão do dataset (partilhados entre espaços:
+# a análise é determinística, logo os mesmos dados dão o mesmo relatório)
+report_cache = OrderedDict()
+report_cache_lock = threading.Lock()
+
+# Armazém partilhado entre processos (só no modo de produção, ver smarttour_server)
+store = None
+
+def enable_store(root='results_store'):
+    """Ativa o armazém partilhado e pré-carrega os últimos resultados"""
+    global store
+    store = ResultsStore(root)
+    # Estado dos espaços e das tarefas visível em todos os workers
+    workspaces.status_listener = store.save_status
+    jobs.on_change = store.save_job
+    jobs.cancel_source = store.cancel_request
+    return store.preload(workspaces)
+
+def publish(ws):
+    """Torna os dados/resultados do espaço visíveis aos outros processos"""
+    if store is not None:
+        store.publish(ws)
+
+def current_workspace():
+    """Espaço do pedido atual (cabeçalho X-Workspace-Id ou sessão)"""
+    workspace_id = request.headers.get('X-Workspace-Id')
+    if not workspace_id or not WORKSPACE_ID_PATTERN.fullmatch(workspace_id):
+        workspace_id = session.get('workspace_id')
+    if not workspace_id:
+        workspace_id = WorkspaceRegistry.new_id()
+        session['workspace_id'] = workspace_id
+    ws = workspaces.get(workspace_id)
+    if store is not None:
+        store.sync(ws)
+    return ws
+
+def rate_limited(view):
+    """Aplica o limite de pedidos por cliente (429 na API, aviso nas páginas)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        allowed, retry_after = rate_limiter.allow((request.remote_addr, request.endpoint))
+        if allowed:
+            return view(*args, **kwargs)
+        
+        if request.path.startswith('/api/'):
+            response = jsonify({'error': 'Demasiados pedidos', 'retry_after': retry_after})
+            response.status_code = 429
+        else:
+            flash(f'Demasiados pedidos. Tente novamente dentro de {retry_after:.0f}s.', 'warning')
+            response = redirect(url_for('index'))
+        response.headers['Retry-After'] = str(max(1, round(retry_after)))
+        return response
+    return wrapper
 
 def allowed_file(filename):
     """Verifica se arquivo é permitido"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'csv', 'xlsx', 'xls'}
 
+def not_modified(etag):
+    """Resposta 304 se o cliente já tem esta versão (antes de qualquer renderização)"""
+    if request.if_none_match.contains(etag):
+        return tag(Response(status=304), etag)
+    return None
+
+def tag(response, etag, cache_control='private, no-cache'):
+    """Marca a resposta com ETag forte para revalidação condicional"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def results_etag(snap):
+    """ETag dos resultados: versão do dataset + execução da análise"""
+    return f'{snap.dataset_version}-{snap.analysis_run}'
+
+def encode_page(html):
+    """Variantes da página: sem compressão, gzip e (se disponível) brotli"""
+    raw = html.encode('utf-8')
+    variants = {'identity': raw, 'gzip': gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(raw, mode=brotli.MODE_TEXT)
+    return variants
+
+def send_page(variants, etag, mimetype='text/html'):
+    """Envia a variante preferida pelo cliente (Accept-Encoding)"""
+    encoding = request.accept_encodings.best_match(
+        [name for name in ('br', 'gzip') if name in variants], default='identity')
+    response = Response(variants[encoding], mimetype=mimetype)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return tag(response, etag)
+
 @app.route('/')
 def index():
     """Página inicial"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
     status = smarttour.get_status()
     return render_template('index.html', 
                          status=status, 
-                         analysis_status=analysis_status)
+                         analysis_status=ws.status)
 
 @app.route('/load_default', methods=['POST'])
 def load_default_data():
     """Carrega dados padrão"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
     try:
         success = smarttour.load_data()
         if success:
-            analysis_status.update({
-                'message': 'Dados padrão carregados com sucesso!',
-                'last_update': datetime.now().isoformat()
-            })
+            ws.update_status(completed=False, progress=0, message='Dados padrão carregados com sucesso!')
+            publish(ws)
             flash('Dados padrão carregados com sucesso! ✅', 'success')
         else:
             flash('Erro ao carregar dados padrão ❌', 'error')
@@ -69,6 +195,8 @@ def load_default_data():
 @app.route('/upload', methods=['POST'])
 def upload_files():
     """Upload de arquivos personalizados"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
     try:
         visitors_file = request.files.get('visitors_file')
         eco_sites_file = request.files.get('eco_sites_file')
@@ -85,8 +213,9 @@ def upload_files():
         visitors_filename = secure_filename(visitors_file.filename)
         eco_sites_filename = secure_filename(eco_sites_file.filename)
         
-        visitors_path = os.path.join(app.config['UPLOAD_FOLDER'], visitors_filename)
-        eco_sites_path = os.path.join(app.config['UPLOAD_FOLDER'], eco_sites_filename)
+        os.makedirs(ws.upload_folder, exist_ok=True)
+        visitors_path = os.path.join(ws.upload_folder, visitors_filename)
+        eco_sites_path = os.path.join(ws.upload_folder, eco_sites_filename)
         
         visitors_file.save(visitors_path)
         eco_sites_file.save(eco_sites_path)
@@ -95,10 +224,9 @@ def upload_files():
         success = smarttour.load_data(visitors_path, eco_sites_path)
         
         if success:
-            analysis_status.update({
-                'message': f'Dados personalizados carregados: {visitors_filename}, {eco_sites_filename}',
-                'last_update': datetime.now().isoformat()
-            })
+            ws.update_status(completed=False, progress=0,
+                             message=f'Dados personalizados carregados: {visitors_filename}, {eco_sites_filename}')
+            publish(ws)
             flash('Dados personalizados carregados com sucesso! ✅', 'success')
         else:
             flash('Erro ao carregar dados personalizados ❌', 'error')
@@ -110,119 +238,563 @@ def upload_files():
         return redirect(url_for('index'))
 
 @app.route('/analyze', methods=['POST'])
+@rate_limited
 def run_analysis():
     """Executa análise em background"""
-    if analysis_status['running']:
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    if not smarttour.data_loaded:
+        flash('Carregue os dados primeiro!', 'warning')
+        return redirect(url_for('index'))
+    
+    # Verificação e marcação atómicas: só uma análise por espaço de trabalho
+    if not ws.try_start(message='Na fila de análise...'):
         flash('Análise já está em execução', 'warning')
         return redirect(url_for('index'))
     
-    if not smarttour.data_loaded:
-        flash('Carregue os dados primeiro!', 'warning')
+    try:
+        snap = smarttour.snapshot()
+        job = jobs.submit(analyze_datasets, snap.visitors_df, snap.sites_df,
+                          kind='analysis', workspace_id=ws.id, callback=analysis_callback(ws),
+                          progress=True, key=(snap.dataset_version, 'analysis'))
+    except QueueFull:
+        ws.update_status(running=False, progress=0, message='Servidor ocupado')
+        flash('Servidor ocupado: muitas análises em espera. Tente novamente dentro de instantes.', 'warning')
         return redirect(url_for('index'))
     
-    def analysis_task():
-        analysis_status.update({
-            'running': True,
-            'completed': False,
-            'progress': 10,
-            'message': 'Iniciando análise...',
-            'last_update': datetime.now().isoformat()
-        })
-        
-        try:
-            analysis_status.update({
-                'progress': 30,
-                'message': 'Processando dados de turismo...',
-                'last_update': datetime.now().isoformat()
-            })
-            
-            success = smarttour.perform_analysis()
-            
-            analysis_status.update({
-                'progress': 80,
-                'message': 'Finalizando análise...',
-                'last_update': datetime.now().isoformat()
-            })
-            
-            if success:
-                analysis_status.update({
-                    'running': False,
-                    'completed': True,
-                    'progress': 100,
-                    'message': 'Análise concluída com sucesso!',
-                    'last_update': datetime.now().isoformat()
-                })
+    ws.update_status(job_id=job.id)
+    if job.workspace_id != ws.id:
+        flash('Análise idêntica já em curso: o resultado será partilhado. Acompanhe o progresso abaixo.', 'info')
+    else:
+        flash('Análise iniciada! Acompanhe o progresso abaixo.', 'info')
+    return redirect(url_for('index'))
+
+def analysis_callback(ws):
+    """Reflete o estado da tarefa de análise no estado do espaço de trabalho"""
+    def callback(job):
+        if job.status == 'running':
+            # Progresso real das etapas do pipeline (5% reservados para a fila)
+            ws.update_progress(5 + round(job.progress * 0.9), job.message or 'Iniciando análise...')
+        elif job.status == 'done':
+            ws.results_page = None
+            if ws.smarttour.apply_analysis_results(job.result):
+                ws.update_status(running=False, completed=True, progress=100,
+                                 message='Análise concluída com sucesso!')
+                publish(ws)
             else:
-                analysis_status.update({
-                    'running': False,
-                    'completed': False,
-                    'progress': 0,
-                    'message': 'Erro na análise',
-                    'last_update': datetime.now().isoformat()
-                })
-                
-        except Exception as e:
-            analysis_status.update({
-                'running': False,
-                'completed': False,
-                'progress': 0,
-                'message': f'Erro: {str(e)}',
-                'last_update': datetime.now().isoformat()
-            })
+                ws.update_status(running=False, completed=False, progress=0,
+                                 message='Os dados mudaram durante a análise')
+        elif job.status == 'cancelled':
+            ws.update_status(running=False, completed=False, progress=0,
+                             message='Análise cancelada')
+        elif job.finished:
+            ws.update_status(running=False, completed=False, progress=0,
+                             message=f'Erro: {job.error}')
+    return callback
+
+def find_job(ws, job_id):
+    """
+    Resumo da tarefa se o espaço a acompanha: deste processo ou, com o
+    armazém ativo, de outro worker do servidor pré-fork; None caso contrário
+    """
+    job = jobs.get(job_id)
+    if job is not None:
+        record = job.to_record()
+    else:
+        record = store.load_job(job_id) if store is not None else None
+    if record is None or ws.id not in record['subscribers']:
+        return None
+    return record
+
+def job_summary(record):
+    """Resumo público (sem os espaços que a acompanham nem o ficheiro produzido)"""
+    return {name: value for name, value in record.items() if name not in ('subscribers', 'output')}
+
+@app.route('/api/jobs')
+def list_jobs():
+    """API com as tarefas do espaço de trabalho atual"""
+    ws = current_workspace()
+    records = {job.id: job.to_record() for job in list(jobs.jobs.values())}
+    if store is not None:
+        for record in store.workspace_jobs(ws.id):
+            records.setdefault(record['id'], record)
+    return jsonify({'jobs': [job_summary(r) for r in records.values() if ws.id in r['subscribers']]})
+
+@app.route('/api/jobs/metrics')
+def job_metrics():
+    """API com profundidade da fila, ocupação dos workers e latências"""
+    return jsonify(jobs.metrics())
+
+@app.route('/api/jobs/<job_id>')
+def job_detail(job_id):
+    """API com o estado de uma tarefa"""
+    ws = current_workspace()
+    record = find_job(ws, job_id)
+    if record is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    return jsonify(job_summary(record))
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """API para cancelar uma tarefa em fila ou em execução"""
+    ws = current_workspace()
+    record = find_job(ws, job_id)
+    if record is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
     
-    # Executar análise em thread separada
-    threading.Thread(target=analysis_task, daemon=True).start()
+    job = jobs.get(job_id)
+    if job is None:
+        # Tarefa de outro worker: o cancelamento é aplicado pelo processo que a executa
+        if record['status'] in Job.FINAL_STATES:
+            return jsonify({'error': 'Tarefa já terminada', 'job': job_summary(record)}), 409
+        store.request_cancel(job_id, ws.id)
+        if len(record['subscribers']) > 1:
+            ws.update_status(running=False, completed=False, progress=0, message='Análise cancelada')
+        return jsonify(dict(job_summary(record), cancel_requested=True)), 202
     
-    flash('Análise iniciada! Acompanhe o progresso abaixo.', 'info')
-    return redirect(url_for('index'))
+    if not jobs.cancel(job_id, ws.id):
+        return jsonify({'error': 'Tarefa já terminada', 'job': job.to_dict()}), 409
+    if ws.id not in job.subscribers:
+        # Tarefa partilhada: continua para os outros espaços, este deixa de esperar
+        ws.update_status(running=False, completed=False, progress=0, message='Análise cancelada')
+    return jsonify(job.to_dict())
 
 @app.route('/api/status')
 def get_status():
     """API para status atual"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    # last_update (e não a revisão local) é igual em todos os workers do servidor
+    etag = f'{ws.id}-{ws.status["last_update"]}-{results_etag(smarttour)}'
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
     status = smarttour.get_status()
-    status.update(analysis_status)
-    return jsonify(status)
+    status.update(ws.status)
+    status['workspace_id'] = ws.id
+    return tag(jsonify(status), etag)
+
+@app.route('/api/status/stream')
+def status_stream():
+    """Server-Sent Events com o progresso da análise (substitui o polling)"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    
+    def events():
+        revision = None
+        deadline = time.monotonic() + 600
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            if store is not None:
+                # A análise pode correr noutro worker: o estado chega pelo armazém
+                store.sync_status(ws)
+                new_revision, status = ws.wait_for_change(revision, timeout=1)
+            else:
+                new_revision, status = ws.wait_for_change(revision, timeout=15)
+            if new_revision == revision:
+                if time.monotonic() - last_sent >= 15:
+                    # Heartbeat para manter a ligação aberta através de proxies
+                    last_sent = time.monotonic()
+                    yield ': ping\n\n'
+                continue
+            last_sent = time.monotonic()
+            revision = new_revision
+            status.update(smarttour.get_status(), **status)
+            yield f'id: {revision}\ndata: {json.dumps(status)}\n\n'
+            if not status['running']:
+                return
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/workspaces')
+def workspace_stats():
+    """API com o espaço atual e a ocupação do registo de espaços"""
+    ws = current_workspace()
+    stats = workspaces.stats()
+    stats['current'] = ws.id
+    return jsonify(stats)
+
+@app.route('/api/charts/<name>')
+def chart_spec(name):
+    """Especificação Plotly (JSON) de um gráfico, carregada pela página de resultados"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    snap = smarttour.snapshot()
+    if not snap.analysis_completed:
+        return jsonify({'error': 'Análise não concluída'}), 404
+    
+    run_etag = results_etag(snap)
+    etag = f'{run_etag}-{name}'
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    # Variantes comprimidas guardadas por gráfico enquanto a análise não muda
+    pages = ws.chart_pages
+    if pages is None or pages[0] != run_etag:
+        pages = ws.chart_pages = (run_etag, {})
+    variants = pages[1].get(name)
+    if variants is None:
+        spec = smarttour.chart_spec(name, snap)
+        if spec is None:
+            return jsonify({'error': f'Gráfico desconhecido: {name}'}), 404
+        variants = pages[1][name] = encode_page(spec)
+    return send_page(variants, etag, mimetype='application/json')
 
 @app.route('/api/kpis')
 def get_kpis():
     """API para KPIs principais"""
-    if not smarttour.analysis_completed:
+    ws = current_workspace()
+    snap = ws.smarttour.snapshot()
+    if not snap.analysis_completed:
         return jsonify({'error': 'Análise não concluída'})
     
-    return jsonify(smarttour.kpis)
+    etag = results_etag(snap)
+    # Bytes pré-serializados uma vez por execução da análise
+    return not_modified(etag) or tag(Response(snap.kpis_json, mimetype='application/json'), etag)
+
+@app.route('/api/provinces')
+def list_provinces():
+    """API com a lista de províncias disponíveis"""
+    ws = current_workspace()
+    try:
+        return jsonify(query_provinces(ws.smarttour.snapshot()))
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/api/provinces/<name>')
+def province_detail(name):
+    """API de drill-down: série temporal e sítios de uma província"""
+    ws = current_workspace()
+    try:
+        return jsonify(query_province(ws.smarttour.snapshot(), name))
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/api/batch', methods=['POST'])
+def batch_queries():
+    """
+    Várias consultas num só pedido, todas sobre a mesma vista dos resultados:
+    {"queries": [{"name": "kpis"}, {"name": "province", "args": {"name": "Luanda"}}]}
+    """
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    payload = request.get_json(silent=True) or {}
+    
+    view = smarttour.snapshot()
+    status = dict(ws.status)
+    handlers = dict(QUERIES, status=lambda view: {
+        **status,
+        'data_loaded': view.data_loaded,
+        'analysis_completed': view.analysis_completed,
+        'workspace_id': ws.id
+    })
+    
+    try:
+        results = run_batch(view, payload.get('queries'), handlers)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'dataset_version': view.dataset_version,
+        'analysis_run': view.analysis_run,
+        'results': results
+    })
+
+@app.route('/api/export/<table>')
+@rate_limited
+def export_table(table):
+    """
+    Exporta agregados província × mês ('province_months') ou métricas por
+    sítio ('sites') em CSV ou NDJSON (?format=), com projeção (?columns=a,b)
+    e filtros (?province=Luanda,Namibe&min_month=6)
+    """
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    snap = smarttour.snapshot()
+    tables = {
+        'province_months': lambda: smarttour.province_month_table(snap),
+        'sites': lambda: smarttour.site_metrics_table(snap)
+    }
+    if table not in tables:
+        return jsonify({'error': f'Tabela desconhecida: {table}', 'tables': list(tables)}), 404
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in smarttour_export.EXPORT_FORMATS:
+        return jsonify({'error': 'Formato deve ser csv ou ndjson'}), 400
+    
+    key = (snap.dataset_version, f'export:{table}', snap.analysis_run)
+    data = flights.do(key, tables[table])
+    if data is None:
+        return jsonify({'error': 'Dados não carregados' if table == 'province_months' else 'Análise não concluída'}), 404
+    
+    try:
+        columns = smarttour_export.parse_columns(data, request.args.get('columns'))
+        filters = smarttour_export.parse_filters(data, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    chunks = smarttour_export.stream_table(data, fmt, columns, filters)
+    return Response(stream_with_context(chunks),
+                    mimetype=smarttour_export.EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={table}_{snap.dataset_version}.{fmt}'})
+
+def requested_diff(smarttour):
+    """Diferenças entre ?base= e ?target= (por omissão: versão anterior → atual)"""
+    return smarttour.compare_versions(request.args.get('base') or None, request.args.get('target') or None)
+
+@app.route('/api/diff')
+def diff_json():
+    """Diferenças de KPIs, províncias e sítios entre duas versões do dataset (JSON)"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    diff = requested_diff(smarttour)
+    if diff is None:
+        return jsonify({'error': 'Versões não disponíveis para comparação',
+                        'versions': smarttour.dataset_versions()}), 404
+    
+    include_unchanged = request.args.get('all') == '1'
+    etag = f'{diff.base}-{diff.target}-{int(include_unchanged)}'
+    return not_modified(etag) or tag(Response(diff.to_json(include_unchanged), mimetype='application/json'), etag)
+
+@app.route('/diff')
+def diff_report():
+    """Relatório HTML compacto das diferenças entre duas versões do dataset"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    diff = requested_diff(smarttour)
+    if diff is None:
+        flash('Carregue pelo menos duas versões dos dados para comparar', 'warning')
+        return redirect(url_for('index'))
+    
+    etag = f'{diff.base}-{diff.target}-report'
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    return tag(Response(stream_with_context(smarttour.diff_report_chunks(diff)), mimetype='text/html'), etag)
+
+@app.route('/api/geojson')
+def geojson_latest():
+    """Redireciona para o GeoJSON da versão atual do dataset"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    if not smarttour.data_loaded:
+        return jsonify({'error': 'Dados não carregados'}), 404
+    
+    response = redirect(url_for('geojson', version=smarttour.dataset_version))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/geojson/<version>')
+def geojson(version):
+    """GeoJSON pré-comprimido de sítios e províncias (imutável por versão)"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    if not smarttour.data_loaded or version != smarttour.dataset_version:
+        abort(404)
+    
+    etag = f'"{version}"'
+    headers = {
+        'ETag': etag,
+        'Cache-Control': 'public, max-age=31536000, immutable',
+        'Vary': 'Accept-Encoding'
+    }
+    if request.if_none_match.contains(version):
+        return Response(status=304, headers=headers)
+    
+    raw, compressed = smarttour.get_geojson()
+    if 'gzip' in request.accept_encodings:
+        headers['Content-Encoding'] = 'gzip'
+        body = compressed
+    else:
+        body = raw
+    return Response(body, mimetype='application/geo+json', headers=headers)
+
+@app.route('/api/heatmap')
+def heatmap():
+    """Grelha de densidade para o mapa (resolução em graus, ex: ?resolution=0.5)"""
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    if not smarttour.data_loaded:
+        return jsonify({'error': 'Dados não carregados'}), 404
+    
+    try:
+        resolution = float(request.args.get('resolution', 0.5))
+    except ValueError:
+        return jsonify({'error': 'Resolução inválida'}), 400
+    
+    if not 0.05 <= resolution <= 5:
+        return jsonify({'error': 'Resolução deve estar entre 0.05 e 5 graus'}), 400
+    
+    resolution = smarttour_geo.snap_resolution(resolution)
+    etag = f'{smarttour.dataset_version}-{resolution:g}'
+    return not_modified(etag) or tag(jsonify(smarttour.get_heatmap(resolution)), etag)
 
 @app.route('/results')
 def results():
     """Página de resultados"""
-    if not smarttour.analysis_completed:
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    snap = smarttour.snapshot()
+    if not snap.analysis_completed:
         flash('Execute a análise primeiro!', 'warning')
         return redirect(url_for('index'))
     
-    return render_template('results.html', 
-                         kpis=smarttour.kpis,
-                         summary=smarttour.summary_report)
+    etag = results_etag(snap)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    # Renderizada uma vez por execução da análise; depois servida da memória
+    page = ws.results_page
+    if page is None or page[0] != etag:
+        # Só os nomes dos gráficos: cada figura é pedida pelo navegador ao ficar visível
+        html = render_template('results.html', 
+                               kpis=snap.kpis,
+                               summary=smarttour.summary_report(snap),
+                               charts=list(smarttour.chart_inputs(snap)),
+                               plotly_url=PLOTLY_CDN_URL,
+                               compare_available=len(smarttour.dataset_versions()) > 1)
+        page = (etag, encode_page(html))
+        ws.results_page = page
+    return send_page(page[1], etag)
+
+def cached_report(version):
+    with report_cache_lock:
+        report = report_cache.get(version)
+        if report is not None:
+            report_cache.move_to_end(version)
+        return report
 
 @app.route('/export_html')
+@rate_limited
 def export_html():
-    """Exporta relatório HTML"""
-    if not smarttour.analysis_completed:
+    """
+    Exporta relatório HTML (em streaming, sem ficheiros no servidor);
+    ?offline=1 gera o relatório autocontido (&compress=1 comprime o runtime)
+    """
+    ws = current_workspace()
+    smarttour = ws.smarttour
+    snap = smarttour.snapshot()
+    if not snap.analysis_completed:
         flash('Execute a análise primeiro!', 'warning')
         return redirect(url_for('index'))
     
-    try:
-        filename = f"smarttour_angola_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-        success = smarttour.export_report(filename)
-        
-        if success:
-            flash(f'Relatório exportado: {filename}', 'success')
-            return send_file(filename, as_attachment=True)
+    offline = request.args.get('offline') == '1'
+    compress = offline and request.args.get('compress') == '1'
+    mode = 'offline-gz' if compress else 'offline' if offline else 'cdn'
+    version = f'{snap.dataset_version}-{mode}'
+    unchanged = not_modified(version)
+    if unchanged:
+        return unchanged
+    
+    headers = {'Content-Disposition': f'attachment; filename=smarttour_angola_report_{version}.html'}
+    
+    report = cached_report(version)
+    key = None
+    if report is None:
+        # Pedidos simultâneos do mesmo relatório: um gera (em streaming), os outros esperam
+        key = (version, 'report')
+        flight, leader = flights.join(key)
+        if not leader:
+            try:
+                report = flight.wait(timeout=app.config['JOB_TIMEOUT'])
+            except Exception:
+                report = None
+            key = None  # Se o líder falhou, gera sem coalescer
         else:
-            flash('Erro ao exportar relatório', 'error')
-            
-    except Exception as e:
-        flash(f'Erro: {str(e)}', 'error')
+            report = cached_report(version)
+            if report is not None:
+                flights.finish(key, report)
     
-    return redirect(url_for('results'))
+    if report is not None:
+        return tag(Response(report, mimetype='text/html', headers=headers), version)
+    
+    def generate():
+        chunks = []
+        complete = False
+        try:
+            for chunk in smarttour.report_chunks(snap, offline, compress):
+                data = chunk.encode('utf-8')
+                chunks.append(data)
+                yield data
+            complete = True
+        finally:
+            report = b''.join(chunks) if complete else None
+            # Só relatórios completos entram na cache
+            if complete:
+                with report_cache_lock:
+                    report_cache[version] = report
+                    while len(report_cache) > app.config['REPORT_CACHE_SIZE']:
+                        report_cache.popitem(last=False)
+            if key is not None:
+                flights.finish(key, report)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/html', headers=headers)
+    if key is not None:
+        # Garante que quem espera é libertado mesmo que o streaming nunca comece
+        response.call_on_close(lambda: flights.finish(key))
+    return tag(response, version)
+
+def workbook_path(snap):
+    """Livro XLSX de uma versão dos dados (e execução da análise, se houver)"""
+    return os.path.join(app.config['EXPORT_FOLDER'],
+                        f'smarttour_{snap.dataset_version}_{snap.analysis_run or "dados"}.xlsx')
+
+def prune_exports():
+    """Mantém apenas os livros XLSX mais recentes"""
+    books = sorted(Path(app.config['EXPORT_FOLDER']).glob('smarttour_*.xlsx'),
+                   key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in books[app.config['EXPORTS_KEPT']:]:
+        path.unlink(missing_ok=True)
+
+def send_workbook(path):
+    return send_file(os.path.abspath(path), mimetype=smarttour_export.XLSX_MIMETYPE,
+                     as_attachment=True, download_name=os.path.basename(path))
+
+@app.route('/export_xlsx')
+@rate_limited
+def export_xlsx():
+    """
+    Exporta as tabelas por província, província × mês e sítio num livro XLSX
+    O livro é escrito em streaming numa tarefa em background; a página de
+    espera acompanha o progresso e descarrega o ficheiro quando fica pronto
+    """
+    ws = current_workspace()
+    snap = ws.smarttour.snapshot()
+    if not snap.data_loaded:
+        flash('Carregue os dados primeiro!', 'warning')
+        return redirect(url_for('index'))
+    
+    path = workbook_path(snap)
+    if os.path.exists(path):
+        return send_workbook(path)
+    
+    prune_exports()
+    try:
+        job = jobs.submit(export_workbook, path, snap, kind='export', workspace_id=ws.id,
+                          progress=True, key=(snap.dataset_version, 'xlsx', snap.analysis_run))
+    except QueueFull:
+        flash('Servidor ocupado: muitas tarefas em espera. Tente novamente dentro de instantes.', 'warning')
+        return redirect(url_for('index'))
+    return render_template('export.html', job_id=job.id)
+
+@app.route('/export_xlsx/<job_id>')
+def export_xlsx_download(job_id):
+    """Descarrega o livro XLSX de uma tarefa de exportação concluída"""
+    ws = current_workspace()
+    record = find_job(ws, job_id)
+    if record is None or record['kind'] != 'export':
+        abort(404)
+    if record['status'] != 'done':
+        flash(f'Exportação não concluída: {record["error"] or record["status"]}', 'warning')
+        return redirect(url_for('index'))
+    if not os.path.exists(record['output']):
+        # Removido entretanto por prune_exports: volta a exportar
+        return redirect(url_for('export_xlsx'))
+    return send_workbook(record['output'])
 
 # Template da página inicial
 INDEX_TEMPLATE = """
@@ -541,6 +1113,10 @@ INDEX_TEMPLATE = """
             <a href="{{ url_for('export_html') }}" class="btn btn-gold" {% if not status.analysis_completed %}style="opacity: 0.5; pointer-events: none;"{% endif %}>
                 <i class="fas fa-file-export"></i> Exportar Relatório
             </a>
+            
+            <a href="{{ url_for('export_xlsx') }}" class="btn" {% if not status.data_loaded %}style="opacity: 0.5; pointer-events: none;"{% endif %}>
+                <i class="fas fa-file-excel"></i> Exportar Excel
+            </a>
         </div>
         
         <!-- Status da Análise -->
@@ -551,43 +1127,61 @@ INDEX_TEMPLATE = """
             <div class="progress-bar">
                 <div class="progress-fill" id="progress-fill" style="width: {{ analysis_status.progress }}%;"></div>
             </div>
-            <div style="text-align: center; margin-top: 10px; font-size: 0.9em;">
+            <div id="progress-text" style="text-align: center; margin-top: 10px; font-size: 0.9em;">
                 {{ analysis_status.progress }}% concluído
             </div>
         </div>
     </div>
     
     <script>
-        // Atualizar status automaticamente
+        // Mostra o estado da análise recebido do servidor
+        function showStatus(data) {
+            const progressContainer = document.getElementById('progress-container');
+            const statusMessage = document.getElementById('status-message');
+            const progressFill = document.getElementById('progress-fill');
+            const progressText = document.getElementById('progress-text');
+            
+            if (data.running) {
+                progressContainer.style.display = 'block';
+                statusMessage.innerHTML = '<i class="fas fa-cog rotating"></i> ' + data.message;
+                progressFill.style.width = data.progress + '%';
+                progressText.textContent = data.progress + '% concluído' +
+                    (data.eta_seconds !== null ? ' • ~' + Math.ceil(data.eta_seconds) + 's restantes' : '');
+                return true;
+            } else if (data.completed) {
+                progressContainer.style.display = 'block';
+                statusMessage.innerHTML = '<i class="fas fa-check-circle"></i> ' + data.message;
+                progressFill.style.width = '100%';
+                progressText.textContent = '100% concluído';
+                setTimeout(() => {
+                    location.reload();
+                }, 2000);
+            } else {
+                progressContainer.style.display = 'none';
+            }
+            return false;
+        }
+        
+        // Alternativa para navegadores sem EventSource
         function updateStatus() {
             fetch('/api/status')
                 .then(response => response.json())
-                .then(data => {
-                    const progressContainer = document.getElementById('progress-container');
-                    const statusMessage = document.getElementById('status-message');
-                    const progressFill = document.getElementById('progress-fill');
-                    
-                    if (data.running) {
-                        progressContainer.style.display = 'block';
-                        statusMessage.innerHTML = '<i class="fas fa-cog rotating"></i> ' + data.message;
-                        progressFill.style.width = data.progress + '%';
-                    } else if (data.completed) {
-                        progressContainer.style.display = 'block';
-                        statusMessage.innerHTML = '<i class="fas fa-check-circle"></i> ' + data.message;
-                        progressFill.style.width = '100%';
-                        setTimeout(() => {
-                            location.reload();
-                        }, 2000);
-                    } else {
-                        progressContainer.style.display = 'none';
-                    }
-                })
+                .then(showStatus)
                 .catch(error => console.error('Erro ao atualizar status:', error));
         }
         
-        // Atualizar a cada 2 segundos se análise estiver rodando
         {% if analysis_status.running %}
-        setInterval(updateStatus, 2000);
+        if (window.EventSource) {
+            // Progresso enviado pelo servidor a cada etapa (Server-Sent Events)
+            const stream = new EventSource('/api/status/stream');
+            stream.onmessage = event => {
+                if (!showStatus(JSON.parse(event.data))) {
+                    stream.close();
+                }
+            };
+        } else {
+            setInterval(updateStatus, 2000);
+        }
         {% endif %}
     </script>
 </body>
@@ -603,6 +1197,8 @@ RESULTS_TEMPLATE = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>📊 Resultados - SmartTour Angola</title>
     <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
+    <link href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" rel="stylesheet">
+    <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
     <style>
         /* Reutilizar estilos da página inicial */
         :root {
@@ -727,6 +1323,32 @@ RESULTS_TEMPLATE = """
             content: "💡 ";
             margin-right: 10px;
         }
+        
+        #map {
+            height: 450px;
+            border-radius: 10px;
+        }
+        
+        .map-controls select {
+            background: var(--bg-light);
+            color: var(--white);
+            border: 1px solid var(--gray);
+            border-radius: 5px;
+            padding: 5px 10px;
+        }
+        
+        .chart {
+            min-height: 450px;
+            margin: 15px 0;
+            background: var(--white);
+            border-radius: 10px;
+        }
+        
+        .chart-loading {
+            color: var(--bg-light);
+            text-align: center;
+            padding-top: 200px;
+        }
     </style>
 </head>
 <body>
@@ -746,6 +1368,17 @@ RESULTS_TEMPLATE = """
                     <a href="{{ url_for('export_html') }}" class="btn btn-gold">
                         <i class="fas fa-download"></i> Exportar HTML
                     </a>
+                    <a href="{{ url_for('export_html', offline=1) }}" class="btn">
+                        <i class="fas fa-plane"></i> HTML Offline
+                    </a>
+                    <a href="{{ url_for('export_xlsx') }}" class="btn">
+                        <i class="fas fa-file-excel"></i> Exportar Excel
+                    </a>
+                    {% if compare_available %}
+                    <a href="{{ url_for('diff_report') }}" class="btn">
+                        <i class="fas fa-code-compare"></i> Comparar Versões
+                    </a>
+                    {% endif %}
                 </div>
             </div>
             
@@ -848,7 +1481,220 @@ RESULTS_TEMPLATE = """
             </div>
             {% endfor %}
         </div>
+        
+        <!-- Gráficos (carregados ao entrar no ecrã) -->
+        {% if charts %}
+        <div class="card">
+            <h2 class="section-title"><i class="fas fa-chart-line"></i> Gráficos</h2>
+            {% for name in charts %}
+            <div class="chart lazy-chart" data-chart="{{ name }}">
+                <div class="chart-loading"><i class="fas fa-spinner fa-spin"></i> A carregar gráfico...</div>
+            </div>
+            {% endfor %}
+        </div>
+        {% endif %}
+        
+        <!-- Mapa de Densidade -->
+        <div class="card">
+            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 20px;">
+                <h2 class="section-title" style="margin: 0;"><i class="fas fa-map-marked-alt"></i> Mapa de Densidade</h2>
+                <div class="map-controls">
+                    <select id="heatmap-layer">
+                        <option value="pressure">Pressão de Visitantes</option>
+                        <option value="demand">Procura Atribuída</option>
+                        <option value="capacity">Capacidade Eco</option>
+                    </select>
+                </div>
+            </div>
+            <div id="map"></div>
+        </div>
+    </div>
+    
+    <script>
+        // Mapa com sítios (GeoJSON) e grelha de densidade por resolução
+        const map = L.map('map').setView([-11.5, 17.8], 5);
+        L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+            attribution: '&copy; OpenStreetMap'
+        }).addTo(map);
+        
+        fetch('/api/geojson')
+            .then(response => response.json())
+            .then(data => {
+                L.geoJSON(data, {
+                    filter: feature => feature.properties.kind === 'site',
+                    pointToLayer: (feature, latlng) => L.circleMarker(latlng, {
+                        radius: 6, color: '#FFCD00', fillColor: '#CE1126', fillOpacity: 0.9
+                    }),
+                    onEachFeature: (feature, layer) => {
+                        const p = feature.properties;
+                        layer.bindPopup(`<b>${p.name}</b><br>${p.province}<br>` +
+                                        `Fragilidade: ${p.fragility_index}<br>` +
+                                        `Capacidade: ${p.capacity_daily}/dia<br>Taxa: ${p.fee_aoa} AOA`);
+                    }
+                }).addTo(map);
+            })
+            .catch(error => console.error('Erro ao carregar GeoJSON:', error));
+        
+        const heatLayer = L.layerGroup().addTo(map);
+        const grids = {};
+        
+        function resolutionForZoom(zoom) {
+            if (zoom <= 5) return 1;
+            if (zoom <= 7) return 0.5;
+            return 0.25;
+        }
+        
+        function drawHeatmap() {
+            const resolution = resolutionForZoom(map.getZoom());
+            const layer = document.getElementById('heatmap-layer').value;
+            const render = grid => {
+                heatLayer.clearLayers();
+                const max = Math.max(...grid.cells.map(c => c[layer]), 1e-9);
+                grid.cells.forEach(c => {
+                    L.rectangle([[c.lat, c.lon], [c.lat + grid.resolution, c.lon + grid.resolution]], {
+                        stroke: false, fillColor: '#CE1126', fillOpacity: 0.15 + 0.6 * c[layer] / max
+                    }).bindTooltip(`${layer}: ${c[layer]}`).addTo(heatLayer);
+                });
+            };
+            
+            if (grids[resolution]) {
+                render(grids[resolution]);
+                return;
+            }
+            fetch('/api/heatmap?resolution=' + resolution)
+                .then(response => response.json())
+                .then(grid => { grids[resolution] = grid; render(grid); })
+                .catch(error => console.error('Erro ao carregar heatmap:', error));
+        }
+        
+        map.on('zoomend', drawHeatmap);
+        document.getElementById('heatmap-layer').addEventListener('change', drawHeatmap);
+        drawHeatmap();
+        
+        // Gráficos: o runtime Plotly e cada especificação só são pedidos
+        // quando o gráfico se aproxima da área visível
+        let plotlyReady = null;
+        
+        function loadPlotly() {
+            if (!plotlyReady) {
+                plotlyReady = new Promise((resolve, reject) => {
+                    const script = document.createElement('script');
+                    script.src = '{{ plotly_url }}';
+                    script.onload = resolve;
+                    script.onerror = reject;
+                    document.head.appendChild(script);
+                });
+            }
+            return plotlyReady;
+        }
+        
+        function loadChart(el) {
+            Promise.all([loadPlotly(), fetch('/api/charts/' + el.dataset.chart).then(response => {
+                    if (!response.ok) throw new Error('HTTP ' + response.status);
+                    return response.json();
+                })])
+                .then(([, spec]) => {
+                    el.innerHTML = '';
+                    Plotly.newPlot(el, spec.data, spec.layout, {responsive: true});
+                })
+                .catch(error => {
+                    el.querySelector('.chart-loading').textContent = 'Erro ao carregar gráfico';
+                    console.error('Erro ao carregar gráfico:', error);
+                });
+        }
+        
+        const lazyCharts = document.querySelectorAll('.lazy-chart');
+        if ('IntersectionObserver' in window) {
+            const observer = new IntersectionObserver((entries) => {
+                entries.forEach(entry => {
+                    if (entry.isIntersecting) {
+                        observer.unobserve(entry.target);
+                        loadChart(entry.target);
+                    }
+                });
+            }, {rootMargin: '200px'});
+            lazyCharts.forEach(el => observer.observe(el));
+        } else {
+            lazyCharts.forEach(loadChart);
+        }
+    </script>
+</body>
+</html>
+"""
+
+# Template da página de espera da exportação XLSX
+EXPORT_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="pt">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>SmartTour Angola - Exportar Excel</title>
+    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
+    <style>
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            background: #1a1a1a;
+            color: #ffffff;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            min-height: 100vh;
+            margin: 0;
+        }
+        .card {
+            background: #2d2d2d;
+            border: 1px solid #00d084;
+            border-radius: 15px;
+            padding: 30px;
+            width: 420px;
+            text-align: center;
+        }
+        .progress-bar {
+            background: #404040;
+            border-radius: 10px;
+            height: 20px;
+            overflow: hidden;
+            margin: 20px 0 10px 0;
+        }
+        .progress-fill {
+            background: linear-gradient(90deg, #00d084, #66ff99);
+            height: 100%;
+            width: 0;
+            transition: width 0.3s ease;
+        }
+        a { color: #ffd700; }
+    </style>
+</head>
+<body>
+    <div class="card">
+        <h2><i class="fas fa-file-excel"></i> Exportar Excel</h2>
+        <div class="progress-bar"><div class="progress-fill" id="progress-fill"></div></div>
+        <div id="message">Na fila de exportação...</div>
+        <p><a href="{{ url_for('index') }}"><i class="fas fa-arrow-left"></i> Voltar</a></p>
     </div>
+    
+    <script>
+        // Acompanha a tarefa e descarrega o livro quando estiver pronto
+        function poll() {
+            fetch('/api/jobs/{{ job_id }}')
+                .then(response => response.json())
+                .then(job => {
+                    document.getElementById('progress-fill').style.width = (job.progress || 0) + '%';
+                    document.getElementById('message').textContent = job.message || job.error || 'A exportar...';
+                    if (job.status === 'done') {
+                        document.getElementById('message').textContent = 'Livro pronto: a descarregar...';
+                        location.href = '{{ url_for("export_xlsx_download", job_id=job_id) }}';
+                    } else if (['failed', 'cancelled', 'timeout'].includes(job.status)) {
+                        document.getElementById('message').textContent = 'Erro: ' + (job.error || job.status);
+                    } else {
+                        setTimeout(poll, 1000);
+                    }
+                })
+                .catch(error => console.error('Erro ao consultar a exportação:', error));
+        }
+        poll();
+    </script>
 </body>
 </html>
 """
@@ -863,6 +1709,9 @@ with open('templates/index.html', 'w', encoding='utf-8') as f:
 with open('templates/results.html', 'w', encoding='utf-8') as f:
     f.write(RESULTS_TEMPLATE)
 
+with open('templates/export.html', 'w', encoding='utf-8') as f:
+    f.write(EXPORT_TEMPLATE)
+
 def main():
     """Função principal"""
     print("🇦🇴 SmartTour Angola - Web App")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+SmartTour Angola - Espaços de Trabalho
+Cada analista (sessão) tem os seus próprios dados, resultados e estado,
+com remoção LRU dos espaços inativos quando o limite de memória é atingido
+"""
+
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+from smarttour_core import SmartTourCore
+
+
+class Workspace:
+    """Espaço de análise isolado de um analista"""
+
+    def __init__(self, workspace_id, upload_root='uploads', status_listener=None):
+        self.id = workspace_id
+        self.smarttour = SmartTourCore()
+        self.upload_folder = Path(upload_root) / 'workspaces' / workspace_id
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.revision = 0
+        self.started_at = None
+        self.last_access = time.monotonic()
+        self.results_page = None  # (etag, variantes comprimidas) da página de resultados
+        self.chart_pages = None   # (etag da análise, {gráfico: variantes comprimidas})
+        self.store_stamp = None   # Publicação do armazém partilhado já aplicada
+        self.status_stamp = None  # Estado partilhado (armazém) já aplicado ou escrito
+        self.status_listener = status_listener  # Chamado (com lock) a cada mudança de estado
+        self.status = {
+            'running': False,
+            'completed': False,
+            'progress': 0,
+            'message': 'Sistema pronto',
+            'eta_seconds': None,
+            'last_update': datetime.now().isoformat()
+        }
+
+    def _publish(self, changes):
+        """Aplica alterações ao estado e acorda quem espera por eventos (com lock)"""
+        self.status.update(changes, last_update=datetime.now().isoformat())
+        progress = self.status['progress']
+        if self.status['running'] and self.started_at and 0 < progress < 100:
+            elapsed = time.monotonic() - self.started_at
+            self.status['eta_seconds'] = round(elapsed * (100 - progress) / progress, 1)
+        else:
+            self.status['eta_seconds'] = None
+        self.revision += 1
+        self.changed.notify_all()
+        if self.status_listener is not None:
+            self.status_listener(self)
+
+    def apply_status(self, status):
+        """Estado recebido de outro processo do servidor (não volta a ser partilhado)"""
+        with self.lock:
+            self.status = dict(status)
+            self.revision += 1
+            self.changed.notify_all()
+
+    def update_status(self, **changes):
+        """Atualiza o estado da análise deste espaço"""
+        with self.lock:
+            self._publish(changes)
+
+    def update_progress(self, progress, message):
+        """Progresso de uma etapa; ignorado se a análise já terminou"""
+        with self.lock:
+            if self.status['running']:
+                self._publish({'progress': progress, 'message': message})
+
+    def try_start(self, message='Iniciando análise...'):
+        """Marca a análise como iniciada; False se já estiver a correr"""
+        with self.lock:
+            if self.status['running']:
+                return False
+            self.started_at = time.monotonic()
+            self._publish({'running': True, 'completed': False, 'progress': 0, 'message': message})
+            return True
+
+    def wait_for_change(self, revision, timeout=15):
+        """Espera até o estado passar da revisão dada; retorna (revisão, estado)"""
+        with self.lock:
+            self.changed.wait_for(lambda: self.revision != revision, timeout=timeout)
+            return self.revision, dict(self.status)
+
+    @property
+    def busy(self):
+        return self.status['running']
+
+    def memory_usage(self):
+        """Memória aproximada (bytes) ocupada pelos dados deste espaço (já calculada em set_data)"""
+        return self.smarttour.snapshot().data_bytes
+
+    @property
+    def has_data(self):
+        return self.smarttour.data_loaded
+
+    def discard(self):
+        """Remove os ficheiros enviados para este espaço"""
+        shutil.rmtree(self.upload_folder, ignore_errors=True)
+
+
+class WorkspaceRegistry:
+    """Registo de espaços de trabalho com remoção LRU dos inativos"""
+
+    def __init__(self, max_workspaces=32, max_memory_mb=512, upload_root='uploads'):
+        self.max_workspaces = max_workspaces
+        self.max_memory = max_memory_mb * 1024 * 1024
+        self.upload_root = upload_root
+        self.workspaces = OrderedDict()
+        self.lock = threading.Lock()
+        self.status_listener = None  # Passado aos espaços novos (ver ResultsStore.save_status)
+
+    @staticmethod
+    def new_id():
+        return uuid.uuid4().hex[:16]
+
+    def get(self, workspace_id):
+        """Retorna o espaço (criando-o se necessário) e marca-o como usado"""
+        with self.lock:
+            workspace = self.workspaces.get(workspace_id)
+            if workspace is None:
+                workspace = Workspace(workspace_id, self.upload_root, self.status_listener)
+                self.workspaces[workspace_id] = workspace
+            self.workspaces.move_to_end(workspace_id)
+            workspace.last_access = time.monotonic()
+            self._evict()
+            return workspace
+
+    def _evict(self):
+        """
+        Remove os espaços menos usados e parados até cumprir os limites
+        O limite de número só remove espaços vazios (pedidos sem cookie, como
+        crawlers ou health checks, não expulsam os dados de um analista);
+        espaços com dados só saem para cumprir o limite de memória
+        """
+        newest = next(reversed(self.workspaces))
+        total = sum(ws.memory_usage() for ws in self.workspaces.values())
+
+        for ws_id in list(self.workspaces):
+            over_count = len(self.workspaces) > self.max_workspaces
+            over_memory = total > self.max_memory
+            if not over_count and not over_memory:
+                break
+            workspace = self.workspaces[ws_id]
+            # Nunca remove o espaço acabado de usar nem um com análise em curso
+            if ws_id == newest or workspace.busy:
+                continue
+            if workspace.has_data and not over_memory:
+                continue
+            del self.workspaces[ws_id]
+            total -= workspace.memory_usage()
+            workspace.discard()
+
+    def stats(self):
+        """Resumo do registo (para monitorização)"""
+        with self.lock:
+            return {
+                'workspaces': len(self.workspaces),
+                'running': sum(1 for ws in self.workspaces.values() if ws.busy),
+                'memory_mb': round(sum(ws.memory_usage() for ws in self.workspaces.values()) / 1024 / 1024, 2),
+                'max_workspaces': self.max_workspaces,
+                'max_memory_mb': self.max_memory // 1024 // 1024
+            }
@@ -79,10 +79,278 @@ def test_core():
             
         if core.perform_analysis():
             print("   ✅ Análise completa")
-            return True
         else:
             print("   ❌ Erro na análise")
             return False
+
+        from smarttour_charts import figure_cache
+        first = core.create_charts()
+        hits = figure_cache.stats()['hits']
+        if core.create_charts() == first and figure_cache.stats()['hits'] == hits + len(first):
+            print("   ✅ Gráficos reutilizados da cache")
+            return True
+        else:
+            print("   ❌ Gráficos reconstruídos com as mesmas entradas")
+            return False
+            
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
+        return False
+
+def test_simulation():
+    """Testa a simulação Monte Carlo de receitas"""
+    print("\n🎲 Testando simulação de receitas...")
+    
+    try:
+        from smarttour_core import SmartTourCore
+        
+        core = SmartTourCore()
+        core.load_data()
+        result = core.simulate_revenue(n_draws=20_000, workers=1, seed=42)
+        
+        p = result['percentiles']
+        if p['p5'] <= p['p50'] <= p['p95'] and result['n_draws'] == 20_000:
+            print(f"   ✅ Percentis coerentes (p50: {p['p50']:,} AOA)")
+            return True
+        else:
+            print(f"   ❌ Percentis inválidos: {p}")
+            return False
+            
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
+        return False
+
+def test_jobs():
+    """Testa a fila limitada de tarefas"""
+    print("\n⚙️  Testando fila de tarefas...")
+    
+    try:
+        import time
+        from smarttour_jobs import JobManager, QueueFull
+        
+        manager = JobManager(workers=1, max_queue=1, use_processes=False)
+        first = manager.submit(time.sleep, 0.2)
+        time.sleep(0.05)
+        second = manager.submit(time.sleep, 0.01)
+        
+        try:
+            manager.submit(time.sleep, 0.01)
+            print("   ❌ Fila cheia não foi recusada")
+            return False
+        except QueueFull:
+            print("   ✅ Fila limitada recusa excesso")
+        
+        manager.cancel(second.id)
+        first.done_event.wait(2)
+        
+        if first.status == 'done' and second.status == 'cancelled':
+            print("   ✅ Execução e cancelamento")
+        else:
+            print(f"   ❌ Estados inesperados: {first.status}, {second.status}")
+            return False
+        
+        a = manager.submit(time.sleep, 0.05, workspace_id='a', key=('v1', 'analysis'))
+        b = manager.submit(time.sleep, 0.05, workspace_id='b', key=('v1', 'analysis'))
+        a.done_event.wait(2)
+        if a is b and set(a.subscribers) == {'a', 'b'}:
+            print("   ✅ Pedidos idênticos coalescidos")
+            return True
+        else:
+            print("   ❌ Pedidos idênticos não foram coalescidos")
+            return False
+            
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
+        return False
+
+def test_job_timeout():
+    """Testa que uma tarefa fora do tempo limite liberta o worker"""
+    print("\n⏱️  Testando tempo limite das tarefas...")
+    
+    try:
+        import time
+        from smarttour_jobs import JobManager
+        
+        manager = JobManager(workers=1, timeout=1)
+        slow = manager.submit(time.sleep, 3)
+        fast = manager.submit(time.sleep, 0.5)
+        fast.done_event.wait(10)
+        manager.shutdown()
+        
+        if slow.status == 'timeout' and fast.status == 'done':
+            print("   ✅ Tarefa interrompida; a seguinte correu no tempo dela")
+            return True
+        else:
+            print(f"   ❌ Estados inesperados: {slow.status}, {fast.status}")
+            return False
+            
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
+        return False
+
+def test_province_reports():
+    """Testa os relatórios por província e a reconstrução incremental"""
+    print("\n🗺️  Testando relatórios por província...")
+    
+    try:
+        import tempfile
+        from smarttour_core import SmartTourCore
+        from smarttour_batch import export_province_reports
+        
+        core = SmartTourCore()
+        core.load_data()
+        with tempfile.TemporaryDirectory() as output_dir:
+            first = export_province_reports(core, output_dir, workers=1)
+            second = export_province_reports(core, output_dir, workers=1)
+        
+        if first['generated'] and not second['generated'] and second['skipped'] == first['generated']:
+            print(f"   ✅ {len(first['generated'])} relatórios gerados, reutilizados sem alterações")
+            return True
+        else:
+            print(f"   ❌ Reconstrução incremental inválida: {first} / {second}")
+            return False
+            
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
+        return False
+
+def test_compare_versions():
+    """Testa a comparação entre duas versões do dataset"""
+    print("\n🔀 Testando comparação de versões...")
+    
+    try:
+        from smarttour_core import SmartTourCore
+        
+        core = SmartTourCore()
+        core.load_data()
+        core.perform_analysis()
+        base_shown = core.kpis.tourism_kpis.total_annual_visitors
+        visitors_df, sites_df = core.visitors_df, core.sites_df
+        
+        # Nova versão: mais visitantes numa província e um sítio a menos
+        province = visitors_df['province'].iloc[0]
+        removed_site = sites_df['site_name'].iloc[-1]
+        new_visitors = visitors_df.copy()
+        new_visitors.loc[new_visitors['province'] == province, 'visitors_total'] *= 2
+        core.set_data(new_visitors, sites_df[sites_df['site_name'] != removed_site].reset_index(drop=True))
+        core.perform_analysis()
+        
+        diff = core.compare_versions()
+        shown = core.kpis.tourism_kpis.total_annual_visitors
+        old, new, delta, _ = diff.summary['total_annual_visitors']
+        provinces = diff.provinces['status']
+        
+        if (old == base_shown and new == shown and delta == shown - old
+                and diff.summary['sustainable_sites_percentage'][1] == core.kpis.sustainability_kpis.sustainable_sites_percentage
+                and provinces[province] == 'changed'
+                and diff.sites['status'][removed_site] == 'removed'):
+            print(f"   ✅ Diferenças coerentes com os KPIs publicados (Δ visitantes: {delta:+,})")
+            return True
+        else:
+            print(f"   ❌ Diferenças inválidas: {diff.summary}")
+            return False
+            
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
+        return False
+
+def test_load_without_analysis():
+    """Testa que carregar dados não corre as análises (KPIs da comparação só a pedido)"""
+    print("\n📥 Testando carregamento sem análise...")
+    
+    try:
+        from smarttour_core import SmartTourCore
+        
+        core = SmartTourCore()
+        core.load_data()
+        visitors_df, sites_df = core.visitors_df, core.sites_df
+        
+        calls = []
+        analyze_visitors = core.analyze_visitors
+        core.analyze_visitors = lambda *args, **kwargs: calls.append(args) or analyze_visitors(*args, **kwargs)
+        
+        core.set_data(visitors_df.iloc[1:].reset_index(drop=True), sites_df)
+        loaded_calls = len(calls)
+        diff = core.compare_versions()
+        compare_calls = len(calls) - loaded_calls
+        old, new, _, _ = diff.summary['total_annual_visitors']
+        
+        if (loaded_calls == 0 and compare_calls == 1 and old is None
+                and new == core.dataset_kpis().tourism_kpis.total_annual_visitors):
+            print("   ✅ set_data sem análises; KPIs da versão atual calculados só na comparação")
+            return True
+        else:
+            print(f"   ❌ Análises ao carregar: {loaded_calls}, na comparação: {compare_calls}, resumo: {diff.summary}")
+            return False
+            
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
+        return False
+
+def test_table_export():
+    """Testa a exportação CSV/NDJSON em streaming com filtros e projeção"""
+    print("\n📤 Testando exportação CSV/NDJSON...")
+    
+    try:
+        import io
+        import json
+        import pandas as pd
+        import smarttour_export
+        from smarttour_core import SmartTourCore
+        
+        core = SmartTourCore()
+        core.load_data()
+        table = core.province_month_table()
+        provinces = list(table['province'].unique()[:3])
+        args = {'province': ','.join(provinces), 'min_visitors_total': '10000',
+                'columns': 'province,month,visitors_total'}
+        columns = smarttour_export.parse_columns(table, args['columns'])
+        filters = smarttour_export.parse_filters(table, args)
+        expected = table[table['province'].isin(provinces) & (table['visitors_total'] >= 10000)][columns]
+        
+        csv = ''.join(smarttour_export.stream_table(table, 'csv', columns, filters, chunk_rows=1))
+        ndjson = ''.join(smarttour_export.stream_table(table, 'ndjson', columns, filters, chunk_rows=1))
+        records = [json.loads(line) for line in ndjson.split('\n')[:-1]]
+        from_csv = pd.read_csv(io.StringIO(csv))
+        
+        if (list(from_csv.columns) == columns and len(from_csv) == len(expected)
+                and records == expected.to_dict(orient='records') and ndjson.endswith('}\n')):
+            print(f"   ✅ {len(expected)} linhas filtradas em CSV e NDJSON")
+            return True
+        else:
+            print(f"   ❌ Exportação inválida: {csv!r} / {ndjson!r}")
+            return False
+            
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
+        return False
+
+def test_xlsx_export():
+    """Testa o livro XLSX com várias folhas"""
+    print("\n📊 Testando exportação Excel...")
+    
+    try:
+        import tempfile
+        from openpyxl import load_workbook
+        from smarttour_core import SmartTourCore
+        
+        core = SmartTourCore()
+        core.load_data()
+        core.perform_analysis()
+        with tempfile.TemporaryDirectory() as output_dir:
+            path = os.path.join(output_dir, 'smarttour.xlsx')
+            core.export_xlsx(path)
+            workbook = load_workbook(path, read_only=True)
+            sheets = workbook.sheetnames
+            rows = len(list(workbook['Província x Mês'].iter_rows(values_only=True)))
+            workbook.close()
+        
+        if sheets == ['Províncias', 'Província x Mês', 'Sítios', 'KPIs'] and rows == len(core.province_month_table()) + 1:
+            print(f"   ✅ {len(sheets)} folhas exportadas")
+            return True
+        else:
+            print(f"   ❌ Livro inválido: {sheets} ({rows} linhas)")
+            return False
             
     except Exception as e:
         print(f"   ❌ Erro: {e}")
@@ -97,7 +365,15 @@ def main():
     tests = [
         ("Arquivos", test_files),
         ("Dependências", test_imports), 
-        ("Funcionalidade", test_core)
+        ("Funcionalidade", test_core),
+        ("Simulação", test_simulation),
+        ("Tarefas", test_jobs),
+        ("Tempo limite", test_job_timeout),
+        ("Relatórios por província", test_province_reports),
+        ("Comparação de versões", test_compare_versions),
+        ("Carregamento sem análise", test_load_without_analysis),
+        ("Exportação CSV/NDJSON", test_table_export),
+        ("Exportação Excel", test_xlsx_export)
     ]
     
     passed = 0